@@ -1,62 +1,98 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import asyncio
 import models  # We need this to know what a 'Resume' object is
+import keyword_matcher
 import json
-from pydantic import ValidationError
-
-# Load the .env file
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found. Make sure it's set in your .env file.")
-
-# Configure the Gemini client
-genai.configure(api_key=api_key)
-
-# This is the JSON structure we want the AI to return
-# We will define this in schemas.py as well
-AI_RESPONSE_SCHEMA = {
-    "type": "OBJECT",
-    "properties": {
-        "score": {
-            "type": "NUMBER",
-            "description": "A score from 0-100 of how well the resume matches the job description."
-        },
-        "missing_keywords": {
-            "type": "ARRAY",
-            "items": {"type": "STRING"},
-            "description": "A list of 5-10 key skills or terms from the job description that are missing from the resume."
-        },
-        "suggestions": {
-            "type": "STRING",
-            "description": "A 3-5 bullet point list (as a single string) of specific, actionable advice to improve the resume for this job."
-        }
-    },
-    "required": ["score", "missing_keywords", "suggestions"]
-}
-
-# Set up the model
-generation_config = genai.GenerationConfig(
-    response_mime_type="application/json",
-    response_schema=AI_RESPONSE_SCHEMA
-)
-
-model = genai.GenerativeModel(
-    'gemini-2.5-flash-preview-09-2025',
-    generation_config=generation_config
-)
+import re
+import threading
+import prompt_builder
+import jd_preprocessor
+import llm_providers
+import llm_client
+import analysis_cache
+import metrics
 
-def analyze_resume_with_ai(resume: models.Resume, job_description: str):
+# --- AI provider settings ---
+# Which backend analyzes resumes: "gemini" (the real one) or "fake" (offline, for tests/benchmarks)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash-preview-09-2025")
+# How long the fake provider pretends to think, in seconds
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", 0))
+
+# The provider is created the first time we need it (not when this file is imported),
+# so the API starts fast and works without a Gemini key until someone analyzes a resume.
+_provider = None
+_client = None
+_provider_lock = threading.Lock()
+
+def _create_provider():
+    if LLM_PROVIDER == "gemini":
+        return llm_providers.GeminiProvider(GEMINI_MODEL_NAME)
+    if LLM_PROVIDER == "fake":
+        return llm_providers.FakeProvider(latency_seconds=FAKE_LLM_LATENCY_SECONDS)
+    raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Use 'gemini' or 'fake'.")
+
+def get_provider():
+    """Returns the AI provider, creating it on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _create_provider()
+    return _provider
+
+def get_client():
     """
-    Analyzes a resume against a job description using the Gemini API
-    and returns a structured JSON response.
+    Returns the provider wrapped in our resilient client
+    (retries, circuit breaker, request coalescing). All AI calls go through this.
+    """
+    global _client
+    if _client is None:
+        provider = get_provider()
+        with _provider_lock:
+            if _client is None:
+                _client = llm_client.ResilientLLMClient(provider)
+    return _client
+
+def set_provider(provider: llm_providers.LLMProvider | None):
+    """Swaps in a different provider (e.g. a FakeProvider in tests). None resets it."""
+    global _provider, _client
+    with _provider_lock:
+        _provider = provider
+        _client = None
+
+def model_name():
+    """
+    The name of the model in use. It's part of the analysis cache key.
+    This doesn't create the provider, so cache lookups stay cheap.
+    """
+    if _provider is not None:
+        return _provider.model_name
+    return llm_providers.FakeProvider.model_name if LLM_PROVIDER == "fake" else GEMINI_MODEL_NAME
+
+# --- Concurrency settings ---
+# How many analyses one worker may have in flight at the same time
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", 32))
+# How long we wait for the AI before giving up on one analysis
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", 60))
+
+_analysis_slots = asyncio.Semaphore(ANALYSIS_MAX_CONCURRENCY)
+
+# --- Local pre-scoring ---
+# If the instant keyword score is below / above these, we trust it and skip the AI.
+# They are off by default (a score can never be below 0 or above 100).
+PRESCORE_SKIP_BELOW = float(os.getenv("PRESCORE_SKIP_BELOW", 0))
+PRESCORE_SKIP_ABOVE = float(os.getenv("PRESCORE_SKIP_ABOVE", 100))
+# The model name a skipped analysis is stored under, so the history never passes it off as the AI's
+PRESCORE_MODEL_NAME = "prescore"
+
+
+def build_resume_payload(resume: models.Resume):
+    """
+    Creates a simplified version of the resume to send to the AI.
+    This saves tokens and money, and is cleaner.
     """
-    
-    # 1. We create a simplified version of the resume to send to the AI
-    # This saves tokens and money, and is cleaner.
-    resume_data_for_ai = {
+    return {
         "full_name": resume.full_name,
         "email": resume.email,
         "phone": resume.phone,
@@ -72,38 +108,228 @@ def analyze_resume_with_ai(resume: models.Resume, job_description: str):
         ],
         "skills": [skill.name for skill in resume.skills]
     }
-    
-    # 2. We build the prompt
-    prompt = f"""
-    You are an expert career coach and resume optimization bot named 'GROBS.AI'.
-    Your task is to analyze a user's resume against a specific job description.
-
-    First, here is the user's resume data in JSON format:
-    --- RESUME START ---
-    {json.dumps(resume_data_for_ai, indent=2)}
-    --- RESUME END ---
-
-    Next, here is the job description they are applying for:
-    --- JOB DESCRIPTION START ---
-    {job_description}
-    --- JOB DESCRIPTION END ---
-
-    Please provide a critical analysis. Focus on what is missing and how they can improve.
-    Return your analysis *only* in the requested JSON format.
-    """
-    
-    # 3. We call the AI
+
+def prescore_resume(resume_data_for_ai: dict, job_description: str):
+    """
+    Scores a resume payload against a job description locally, in milliseconds,
+    using keyword coverage instead of the AI. Returns the same shape as an AI analysis.
+    """
+    # The JD's key terms are extracted once per posting (see jd_preprocessor.py)
+    job_terms = jd_preprocessor.prepare(job_description)["terms"]
+    score, missing = keyword_matcher.score_terms(
+        job_terms, keyword_matcher.resume_terms(resume_data_for_ai)
+    )
+
+    if missing:
+        suggestions = (
+            f"- Your resume covers about {score:.0f}% of the job description's key terms.\n"
+            f"- Where they truly apply, mention: {', '.join(missing)}.\n"
+            "- Add them to your skills, and show them in your experience or project descriptions."
+        )
+    else:
+        suggestions = "- Your resume already covers the job description's key terms."
+
+    return {"score": score, "missing_keywords": missing, "suggestions": suggestions}
+
+def prescore_is_decisive(prescore: dict):
+    """True if the instant score is so low (or high) that the AI isn't worth calling."""
+    return prescore["score"] < PRESCORE_SKIP_BELOW or prescore["score"] > PRESCORE_SKIP_ABOVE
+
+def build_prompt(resume_data_for_ai: dict, job_description: str):
+    """
+    Builds the (compact) analysis prompt from the resume payload and the job description,
+    and records its estimated token count.
+    """
+    # The JD part is cleaned and compacted once per posting, so only
+    # the resume part is built for every analysis
+    prepared_jd = jd_preprocessor.prepare(job_description)
+    with metrics.timer("prompt_build"):
+        prompt, stats = prompt_builder.build_prompt(
+            resume_data_for_ai, prepared_jd["text"],
+            job_description_section=(prepared_jd["prompt_section"], prepared_jd["prompt_truncated"])
+        )
+
+    metrics.record_prompt(stats["estimated_tokens"], stats["truncated"])
+
+    return prompt
+
+def run_analysis(resume_data_for_ai: dict, job_description: str):
+    """
+    Calls the Gemini API for an already-built resume payload.
+    Unlike analyze_resume_with_ai, this raises on failure so callers
+    can decide what to do (e.g. not cache a failed analysis).
+    """
+    prompt = build_prompt(resume_data_for_ai, job_description)
+    response_text = get_client().generate(prompt)
+    # We parse the JSON text from the AI's response
+    return json.loads(response_text)
+
+async def run_analysis_async(resume_data_for_ai: dict, job_description: str):
+    """
+    The non-blocking version of run_analysis.
+    It uses the SDK's async API so the event loop keeps serving other
+    requests while we wait, limits how many calls run at once, and
+    raises asyncio.TimeoutError if the AI takes too long.
+    """
+    # "analysis" includes waiting for a free slot; "ai_generate" is just the AI call
+    with metrics.timer("analysis"):
+        prompt = build_prompt(resume_data_for_ai, job_description)
+        client = get_client()
+        async with _analysis_slots:
+            try:
+                response_text = await asyncio.wait_for(
+                    client.generate_async(prompt),
+                    timeout=ANALYSIS_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"The AI did not answer within {ANALYSIS_TIMEOUT_SECONDS} seconds")
+        return json.loads(response_text)
+
+async def analyze_cached(db, resume_id: int, resume_data_for_ai: dict, job_description: str):
+    """
+    Analyzes a resume payload against a job description, using the analysis cache.
+    The key is a hash of the exact data we would send to the AI,
+    so an unchanged resume + JD is a hit. Raises if the AI call fails
+    (failed analyses are never cached).
+    Returns (analysis, name of the model that made it), the model being
+    PRESCORE_MODEL_NAME when the local score was decisive.
+    """
+    cache_key = analysis_cache.make_key(resume_data_for_ai, job_description, model_name())
+    cached = analysis_cache.get(db, cache_key)
+    if cached is not None:
+        return cached, model_name()
+
+    # Obviously poor (or perfect) matches don't need the AI
+    prescore = prescore_resume(resume_data_for_ai, job_description)
+    if prescore_is_decisive(prescore):
+        return prescore, PRESCORE_MODEL_NAME
+
+    analysis_data = await run_analysis_async(resume_data_for_ai, job_description)
+
+    # Save it for next time
+    analysis_cache.put(db, cache_key, resume_id=resume_id, result=analysis_data)
+    return analysis_data, model_name()
+
+# --- Streaming ---
+
+# The order we send the fields to the client in, whatever order the AI writes them
+STREAM_FIELD_ORDER = ["score", "missing_keywords", "suggestions"]
+
+_SCORE_RE = re.compile(r'"score"\s*:\s*(-?[0-9][0-9.eE+-]*)\s*[,}]')
+_KEYWORDS_RE = re.compile(r'"missing_keywords"\s*:\s*(\[(?:[^\]"]|"(?:[^"\\]|\\.)*")*\])')
+_SUGGESTIONS_RE = re.compile(r'"suggestions"\s*:\s*"')
+
+def _decode_partial_json_string(raw: str):
+    """
+    Decodes the body of a JSON string that may still be arriving.
+    Returns (text_so_far, is_finished). Stops before an escape
+    sequence that hasn't fully arrived yet.
+    """
+    i = 0
+    while i < len(raw):
+        char = raw[i]
+        if char == '"':
+            return json.loads('"' + raw[:i] + '"'), True
+        if char == "\\":
+            # \uXXXX needs 6 characters, every other escape needs 2
+            needed = 6 if raw[i + 1:i + 2] == "u" else 2
+            if i + needed > len(raw):
+                break
+            i += needed
+        else:
+            i += 1
+    return json.loads('"' + raw[:i] + '"'), False
+
+class StreamingAnalysisParser:
+    """
+    Reads the AI's JSON answer chunk by chunk and pulls out each field
+    as soon as it's complete (and the suggestions text as it grows).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.sent = set()
+        self.suggestions_sent = 0
+
+    def feed(self, text: str):
+        """Adds a chunk and returns a list of (event, data) pairs that are now ready."""
+        self.buffer += text
+        events = []
+
+        for field in STREAM_FIELD_ORDER:
+            if field in self.sent:
+                continue
+
+            if field == "score":
+                match = _SCORE_RE.search(self.buffer)
+                if not match:
+                    break # Fields are sent in order, so wait for this one
+                events.append(("score", {"score": float(match.group(1))}))
+                self.sent.add(field)
+
+            elif field == "missing_keywords":
+                match = _KEYWORDS_RE.search(self.buffer)
+                if not match:
+                    break
+                events.append(("missing_keywords", {"missing_keywords": json.loads(match.group(1))}))
+                self.sent.add(field)
+
+            elif field == "suggestions":
+                match = _SUGGESTIONS_RE.search(self.buffer)
+                if not match:
+                    break
+                text_so_far, finished = _decode_partial_json_string(self.buffer[match.end():])
+                if len(text_so_far) > self.suggestions_sent:
+                    events.append(("suggestions", {"delta": text_so_far[self.suggestions_sent:]}))
+                    self.suggestions_sent = len(text_so_far)
+                if finished:
+                    self.sent.add(field)
+
+        return events
+
+async def stream_analysis(resume_data_for_ai: dict, job_description: str):
+    """
+    Streams an analysis from the AI.
+    Yields (event, data) pairs: 'score', then 'missing_keywords', then
+    'suggestions' pieces as they're written, and finally 'done' with the full result.
+    Raises on failure, like run_analysis.
+    """
+    prompt = build_prompt(resume_data_for_ai, job_description)
+    parser = StreamingAnalysisParser()
+    client = get_client()
+
+    async with _analysis_slots:
+        try:
+            chunks = client.stream_async(prompt).__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=ANALYSIS_TIMEOUT_SECONDS)
+                except StopAsyncIteration:
+                    break
+                for event in parser.feed(chunk):
+                    yield event
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"The AI did not answer within {ANALYSIS_TIMEOUT_SECONDS} seconds")
+
+    # The whole answer is here now, so parse it properly
+    yield "done", json.loads(parser.buffer)
+
+def error_result(error: Exception):
+    """The fallback analysis we return when the AI call fails."""
+    # Handle cases where the AI gives a bad response (e.g., safety block)
+    return {
+        "score": 0,
+        "missing_keywords": ["Error: Could not analyze resume."],
+        "suggestions": f"An error occurred while analyzing the resume: {str(error)}"
+    }
+
+def analyze_resume_with_ai(resume: models.Resume, job_description: str):
+    """
+    Analyzes a resume against a job description using the Gemini API
+    and returns a structured JSON response.
+    """
     try:
-        response = model.generate_content(prompt)
-        # We parse the JSON text from the AI's response
-        return json.loads(response.text)
-        
+        return run_analysis(build_resume_payload(resume), job_description)
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
-        # Handle cases where the AI gives a bad response (e.g., safety block)
-        # We'll need to update schemas.py to handle this error case
-        return {
-            "score": 0,
-            "missing_keywords": ["Error: Could not analyze resume."],
-            "suggestions": f"An error occurred while analyzing the resume: {str(e)}"
-        }
\ No newline at end of file
+        return error_result(e)
\ No newline at end of file
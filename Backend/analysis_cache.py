@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+import jd_preprocessor
+
+# --- Settings ---
+# How long a cached analysis stays valid (default: 7 days)
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+# How many analyses we keep before evicting the least recently used ones
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 1000))
+
+# --- Counters ---
+# These live in memory, so they reset when the server restarts
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+def _count(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def hash_job_description(text: str):
+    """
+    The job description's fingerprint (see jd_preprocessor.py): cosmetic
+    differences like HTML, spacing, case or boilerplate don't change it.
+    Used in cache keys and to store each JD once.
+    """
+    return jd_preprocessor.prepare(text)["fingerprint"]
+
+def hash_resume_payload(resume_data: dict):
+    """Content hash of the data we send to the AI, so we can tell when a resume changed."""
+    canonical = json.dumps(resume_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def make_key(resume_data: dict, job_description: str, model_name: str):
+    """
+    Builds the content-addressed cache key.
+    The resume payload is dumped with sorted keys so the same data
+    always produces the same hash.
+    """
+    canonical = json.dumps(
+        {
+            "resume": resume_data,
+            "job_description": hash_job_description(job_description),
+            "model": model_name,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get(db: Session, key: str):
+    """Returns the cached analysis for this key, or None on a miss."""
+    entry = _find(db, key)
+
+    if entry is None:
+        _count("misses")
+        return None
+
+    now = time.time()
+    if now - entry.created_at > CACHE_TTL_SECONDS:
+        # Too old, throw it away and treat it as a miss
+        db.delete(entry)
+        db.commit()
+        _count("expired")
+        _count("misses")
+        return None
+
+    # Touch the entry so it becomes the most recently used one
+    entry.last_used_at = now
+    db.commit()
+    _count("hits")
+    return json.loads(entry.result)
+
+def _find(db: Session, key: str):
+    return db.query(models.AnalysisCacheEntry).filter(
+        models.AnalysisCacheEntry.cache_key == key
+    ).first()
+
+def put(db: Session, key: str, resume_id: int, result: dict):
+    """Stores an analysis, then evicts expired and least recently used entries."""
+    now = time.time()
+    entry = _find(db, key)
+
+    if entry is None:
+        entry = models.AnalysisCacheEntry(
+            cache_key=key, resume_id=resume_id, result=json.dumps(result), created_at=now, last_used_at=now
+        )
+        db.add(entry)
+        try:
+            db.flush()
+        except IntegrityError:
+            # Someone else cached the same analysis at the same moment: update theirs
+            db.rollback()
+            entry = _find(db, key)
+            if entry is None:
+                return
+
+    entry.result = json.dumps(result)
+    entry.created_at = now
+    entry.last_used_at = now
+    db.flush()
+
+    _evict(db, now)
+    db.commit()
+
+def _evict(db: Session, now: float):
+    # 1. Drop everything past its TTL
+    expired = db.query(models.AnalysisCacheEntry).filter(
+        models.AnalysisCacheEntry.created_at < now - CACHE_TTL_SECONDS
+    ).delete(synchronize_session=False)
+    if expired:
+        _count("expired", expired)
+
+    # 2. If we are still over the limit, drop the least recently used entries
+    overflow = db.query(models.AnalysisCacheEntry).count() - CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest_ids = [
+            row.id for row in db.query(models.AnalysisCacheEntry.id)
+            .order_by(models.AnalysisCacheEntry.last_used_at)
+            .limit(overflow)
+        ]
+        db.query(models.AnalysisCacheEntry).filter(
+            models.AnalysisCacheEntry.id.in_(oldest_ids)
+        ).delete(synchronize_session=False)
+        _count("evictions", len(oldest_ids))
+
+def invalidate_resume(db: Session, resume_id: int):
+    """
+    Removes every cached analysis for a resume.
+    This does NOT commit, so it joins the caller's transaction.
+    """
+    removed = db.query(models.AnalysisCacheEntry).filter(
+        models.AnalysisCacheEntry.resume_id == resume_id
+    ).delete(synchronize_session=False)
+    if removed:
+        _count("invalidations", removed)
+
+
+def stats(db: Session):
+    """Returns the hit/miss counters and the current cache size."""
+    with _stats_lock:
+        data = dict(_stats)
+    lookups = data["hits"] + data["misses"]
+    data["hit_ratio"] = data["hits"] / lookups if lookups else 0.0
+    data["size"] = db.query(models.AnalysisCacheEntry).count()
+    data["max_entries"] = CACHE_MAX_ENTRIES
+    data["ttl_seconds"] = CACHE_TTL_SECONDS
+    return data
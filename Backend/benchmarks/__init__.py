@@ -0,0 +1,12 @@
+# Benchmarks for the GROBS.AI backend.
+# Run them from the 'backend' folder, e.g.:
+#   python -m benchmarks.db_modes
+#
+#   seed              fill a database with synthetic users and resumes
+#   endpoints         load-test the API end to end (with the fake AI)
+#   micro             update_resume, serialization and prompt building on their own
+#   db_modes          SQLite default vs WAL (vs a server database)
+#   password_hashing  login throughput per hashing pool and bcrypt cost
+#   prompt_size       the analysis prompt before and after compaction
+#   serialization     ORM + Pydantic vs row tuples + orjson for resume lists
+#   compare           diff two result files (every script can write one with --output)
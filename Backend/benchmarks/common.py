@@ -0,0 +1,115 @@
+"""Small helpers shared by the benchmark scripts."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+def summarize(latencies: list[float], elapsed: float):
+    """Turns a list of latencies (in seconds) into throughput and percentiles (in ms)."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def time_calls(func, repeat: int, warmup: int = 3):
+    """Calls func() 'repeat' times (after a few untimed warm-up calls) and summarizes the latencies."""
+    for _ in range(warmup):
+        func()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_metadata():
+    """Where and on what code a result was produced, so results from different runs can be compared."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": int(time.time()),
+    }
+
+
+def sample_resume(n: int, section_size: int = 3):
+    """A synthetic resume in the shape the frontend sends (schemas.ResumeCreate)."""
+    return {
+        "full_name": f"Candidate {n}",
+        "email": f"candidate{n}@example.com",
+        "phone": "555-0100",
+        "linkedin_url": f"https://linkedin.com/in/candidate{n}",
+        "template_name": "classic",
+        "education": [
+            {"school": f"University {i}", "degree": "BSc Computer Science",
+             "start_date": "2012", "end_date": "2016"}
+            for i in range(section_size)
+        ],
+        "experience": [
+            {"company": f"Company {i}", "role": "Software Engineer",
+             "start_date": "2016", "end_date": "2020",
+             "responsibilities": "Built and maintained Python microservices with FastAPI, "
+                                 "PostgreSQL and Docker. Led code reviews and mentored "
+                                 "junior engineers. Improved API latency by 40%."}
+            for i in range(section_size)
+        ],
+        "projects": [
+            {"project_name": f"Project {i}",
+             "description": "A React and TypeScript dashboard backed by a REST API, "
+                            "deployed on AWS with Kubernetes.",
+             "project_url": f"https://github.com/candidate{n}/project{i}"}
+            for i in range(section_size)
+        ],
+        "skills": [{"name": name} for name in
+                   ["Python", "FastAPI", "SQL", "Docker", "Kubernetes", "React",
+                    "AWS", "Git", "Linux", "TypeScript"][:max(1, section_size * 3)]],
+    }
+
+
+def prepare_environment():
+    """
+    Makes the backend importable from a benchmark: it runs from the
+    'backend' folder and uses the local fake AI provider unless told otherwise.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    # Load tests send far more requests than any real user would
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+
+def emit(result: dict, output_path: str | None = None):
+    """Prints one result as a JSON line, and appends it to a file if asked."""
+    line = json.dumps(result, sort_keys=True)
+    print(line)
+    if output_path:
+        with open(output_path, "a") as f:
+            f.write(line + "\n")
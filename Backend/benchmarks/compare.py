@@ -0,0 +1,90 @@
+"""
+Compares two benchmark result files (JSON lines, as written with --output).
+
+    python -m benchmarks.compare before.jsonl after.jsonl
+    python -m benchmarks.compare before.jsonl after.jsonl --fail-above 10
+
+Results are matched on their settings (benchmark, case, mode, sizes...).
+For every latency/throughput number both runs have, it prints one JSON line
+with the two values and the change in percent. With --fail-above it exits
+with status 1 if any p95 latency got worse by more than that many percent.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.common import emit
+
+# Numbers we compare; everything else that isn't a nested result identifies the run
+METRICS = {"throughput_per_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms"}
+# Keys that describe the run itself, not the configuration
+IGNORED = {"run", "elapsed_s", "errors", "count"}
+
+
+def load(path: str):
+    """Reads a results file into {settings key: result}."""
+    results = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            result = json.loads(line)
+            settings = {
+                key: value for key, value in result.items()
+                if key not in IGNORED and key not in METRICS and not isinstance(value, (dict, list))
+            }
+            # If the same configuration was run several times, the last run wins
+            results[json.dumps(settings, sort_keys=True)] = result
+    return results
+
+
+def flatten(result: dict, prefix: str = ""):
+    """Yields (path, value) for every metric, e.g. ('operations.get.p95_ms', 1.2)."""
+    for key, value in result.items():
+        if key in IGNORED:
+            continue
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif key in METRICS and isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--fail-above", type=float, help="fail if a p95 latency regressed by more than this percent")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    regressions = 0
+
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before = dict(flatten(baseline[key]))
+        after = dict(flatten(candidate[key]))
+        for metric in sorted(before.keys() & after.keys()):
+            old, new = before[metric], after[metric]
+            change_pct = round((new - old) / old * 100, 1) if old else None
+            # Lower latency is better, higher throughput is better
+            worse = change_pct is not None and (
+                change_pct < 0 if metric.endswith("throughput_per_s") else change_pct > 0
+            )
+            if (
+                args.fail_above is not None and worse and metric.endswith("p95_ms")
+                and abs(change_pct) > args.fail_above
+            ):
+                regressions += 1
+            emit({**json.loads(key), "metric": metric, "baseline": old, "candidate": new,
+                  "change_pct": change_pct, "worse": worse})
+
+    unmatched = len(baseline.keys() ^ candidate.keys())
+    if unmatched:
+        print(f"{unmatched} result(s) only appear in one of the files and were skipped", file=sys.stderr)
+    if regressions:
+        print(f"{regressions} p95 latency regression(s) above {args.fail_above}%", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compares database modes under concurrent resume CRUD traffic.
+
+Each mode runs in its own process (the engine is configured from
+environment variables at import time) against a fresh database file:
+
+    python -m benchmarks.db_modes --threads 8 --iterations 50
+    python -m benchmarks.db_modes --database-url postgresql+psycopg://localhost/grobs_bench
+
+Every line of output is one JSON result, so runs can be diffed or plotted.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import emit, prepare_environment, sample_resume, summarize
+
+# mode name -> extra environment variables
+SQLITE_MODES = {
+    "sqlite-default": {"SQLITE_TUNING": "0"},
+    "sqlite-wal": {"SQLITE_TUNING": "1"},
+}
+
+OPERATIONS = ["create", "list", "get", "update", "delete"]
+
+
+def run_workload(threads: int, iterations: int, section_size: int):
+    """Runs inside the child process: hammers the CRUD endpoints from many threads."""
+    prepare_environment()
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+
+    def login(n):
+        email, password = f"bench{n}@example.com", "bench-password"
+        client.post("/register/", json={"email": email, "password": password})
+        token = client.post("/token", data={"username": email, "password": password}).json()
+        return {"Authorization": f"Bearer {token['access_token']}"}
+
+    headers = [login(n) for n in range(threads)]
+
+    def worker(n):
+        timings = {op: [] for op in OPERATIONS}
+        errors = 0
+
+        def timed(op, method, url, **kwargs):
+            nonlocal errors
+            start = time.perf_counter()
+            response = client.request(method, url, headers=headers[n], **kwargs)
+            timings[op].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            return response
+
+        for i in range(iterations):
+            body = sample_resume(n * iterations + i, section_size)
+            created = timed("create", "POST", "/resume/", json=body)
+            if created.status_code != 200:
+                continue
+            resume_id = created.json()["id"]
+            timed("list", "GET", "/resumes/?limit=20")
+            timed("get", "GET", f"/resume/{resume_id}")
+            body["skills"] = body["skills"][1:] + [{"name": "Go"}]
+            timed("update", "PUT", f"/resume/{resume_id}", json=body)
+            timed("delete", "DELETE", f"/resume/{resume_id}")
+        return timings, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    combined = {op: [t for timings, _ in results for t in timings[op]] for op in OPERATIONS}
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "errors": sum(errors for _, errors in results),
+        "operations": {op: summarize(combined[op], elapsed) for op in OPERATIONS},
+    }
+
+
+def run_mode(mode: str, env_overrides: dict, args):
+    """Starts a child process for one mode and returns its parsed result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, **env_overrides)
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.db_modes", "--child",
+             "--threads", str(args.threads), "--iterations", str(args.iterations),
+             "--section-size", str(args.section_size)],
+            env=env, capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result.update({"benchmark": "db_modes", "mode": mode, "threads": args.threads,
+                   "iterations": args.iterations, "section_size": args.section_size})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=25, help="CRUD cycles per thread")
+    parser.add_argument("--section-size", type=int, default=3, help="items per resume section")
+    parser.add_argument("--database-url", help="also benchmark this (server) database")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_workload(args.threads, args.iterations, args.section_size)))
+        return
+
+    modes = {mode: dict(env) for mode, env in SQLITE_MODES.items()}
+    if args.database_url:
+        modes["server"] = {"DATABASE_URL": args.database_url}
+
+    for mode, env in modes.items():
+        emit(run_mode(mode, env, args), args.output)
+
+
+if __name__ == "__main__":
+    main()
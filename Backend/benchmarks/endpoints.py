@@ -0,0 +1,145 @@
+"""
+Load-tests the API end to end, through the FastAPI app, with the fake AI provider.
+
+    python -m benchmarks.endpoints --threads 8 --iterations 20
+    python -m benchmarks.endpoints --seed-users 50 --seed-resumes-per-user 40 --llm-latency 0.5
+
+Before the run the database is seeded with background users and resumes
+(see benchmarks/seed.py), then every thread registers its own user, logs
+in, and repeats create -> list -> get -> update -> analyze -> analyze again
+(a cache hit) -> delete. By default a fresh temporary SQLite file is used;
+pass --database-url to test another database.
+
+The output is one JSON line with throughput, p50/p95/p99 latency and the
+average number of SQL statements (from the Server-Timing header) per operation.
+"""
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import emit, prepare_environment, run_metadata, sample_resume, summarize
+
+OPERATIONS = ["register", "login", "create", "list", "get", "update", "analyze", "analyze_cached", "delete"]
+
+_DB_QUERIES_RE = re.compile(r'db;desc="(\d+) queries"')
+
+
+def run(args):
+    prepare_environment()
+    from fastapi.testclient import TestClient
+    import database
+    import main
+    from benchmarks.seed import seed
+
+    with database.SessionLocal() as db:
+        seed(db, args.seed_users, args.seed_resumes_per_user, args.section_size)
+
+    timings = {op: [] for op in OPERATIONS}
+    query_counts = {op: [] for op in OPERATIONS}
+    errors = {op: 0 for op in OPERATIONS}
+    errors_lock = threading.Lock()
+
+    with TestClient(main.app) as client:
+
+        def timed(op, method, url, **kwargs):
+            start = time.perf_counter()
+            response = client.request(method, url, **kwargs)
+            timings[op].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                with errors_lock:
+                    errors[op] += 1
+            match = _DB_QUERIES_RE.search(response.headers.get("server-timing", ""))
+            if match:
+                query_counts[op].append(int(match.group(1)))
+            return response
+
+        def worker(n):
+            email, password = f"load{n}@example.com", "bench-password"
+            timed("register", "POST", "/register/", json={"email": email, "password": password})
+            token = None
+            for _ in range(args.logins):
+                response = timed("login", "POST", "/token", data={"username": email, "password": password})
+                token = response.json().get("access_token")
+            if token is None:
+                return
+            headers = {"Authorization": f"Bearer {token}"}
+
+            for i in range(args.iterations):
+                body = sample_resume(n * args.iterations + i, args.section_size)
+                created = timed("create", "POST", "/resume/", json=body, headers=headers)
+                if created.status_code != 200:
+                    continue
+                resume_id = created.json()["id"]
+                timed("list", "GET", "/resumes/?limit=20", headers=headers)
+                timed("get", "GET", f"/resume/{resume_id}", headers=headers)
+                body["skills"] = body["skills"][1:] + [{"name": "Go"}]
+                timed("update", "PUT", f"/resume/{resume_id}", json=body, headers=headers)
+                # A JD nobody analyzed yet (a cache miss), then the same one again (a hit)
+                job_description = {"text": f"Backend engineer {n}-{i}: Python, FastAPI, SQL, Docker, Kubernetes."}
+                timed("analyze", "POST", f"/resume/{resume_id}/analyze", json=job_description, headers=headers)
+                timed("analyze_cached", "POST", f"/resume/{resume_id}/analyze", json=job_description, headers=headers)
+                timed("delete", "DELETE", f"/resume/{resume_id}", headers=headers)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(worker, range(args.threads)))
+        elapsed = time.perf_counter() - start
+
+    operations = {}
+    for op in OPERATIONS:
+        operations[op] = summarize(timings[op], elapsed)
+        operations[op]["errors"] = errors[op]
+        if query_counts[op]:
+            operations[op]["db_queries_mean"] = round(sum(query_counts[op]) / len(query_counts[op]), 1)
+
+    all_timings = [t for op in OPERATIONS for t in timings[op]]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(all_timings, elapsed),
+        "operations": operations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=20, help="resume cycles per thread")
+    parser.add_argument("--logins", type=int, default=3, help="logins per thread")
+    parser.add_argument("--section-size", type=int, default=3, help="items per resume section")
+    parser.add_argument("--seed-users", type=int, default=20, help="background users created before the run")
+    parser.add_argument("--seed-resumes-per-user", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake AI takes per call")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="bcrypt cost (the app's default is 12)")
+    parser.add_argument("--database-url", help="use this database instead of a temporary SQLite file")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    args = parser.parse_args()
+
+    # The app reads its settings when it's imported, so set them first
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    os.environ.setdefault("ANALYSIS_JOB_WORKERS", "0")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        result = run(args)
+
+    result.update({
+        "benchmark": "endpoints",
+        "threads": args.threads,
+        "iterations": args.iterations,
+        "section_size": args.section_size,
+        "seed_users": args.seed_users,
+        "seed_resumes_per_user": args.seed_resumes_per_user,
+        "llm_latency_s": args.llm_latency,
+        "bcrypt_rounds": args.bcrypt_rounds,
+        "run": run_metadata(),
+    })
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
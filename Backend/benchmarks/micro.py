@@ -0,0 +1,132 @@
+"""
+Micro-benchmarks for the hot spots of a request, without HTTP in the way:
+
+- crud.update_resume: nothing changed, one field, one skill, everything replaced
+- serializing resumes with schemas.Resume (one resume, and a page of them)
+- building the AI payload and prompt
+
+    python -m benchmarks.micro --section-sizes 1 3 10 --repeat 300
+    python -m benchmarks.micro --only update_resume
+
+It runs against a fresh temporary SQLite file. Every line of output is one
+JSON result with p50/p95/p99 latency, so runs can be compared.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import emit, prepare_environment, run_metadata, sample_resume, time_calls
+
+BENCHMARKS = ["update_resume", "serialize_resume", "build_prompt"]
+PAGE_SIZE = 100
+
+JOB_DESCRIPTION = """
+Senior Backend Engineer (Remote). Design, build and operate Python microservices
+with FastAPI and SQLAlchemy. Own our PostgreSQL data model and query performance.
+Deploy with Docker and Kubernetes on AWS; automate with Terraform. Work with Kafka
+and Redis. 5+ years of Python, strong SQL, excellent communication skills.
+"""
+
+
+def bench_update_resume(db, user_id: int, section_size: int, repeat: int):
+    import crud
+    import schemas
+
+    body = sample_resume(1, section_size)
+    resume_id = crud.create_resume(db, schemas.ResumeCreate(**body), user_id=user_id).id
+
+    # Each case flips between two versions, so every call has the same amount of work
+    other_phone = dict(body, phone="555-0199")
+    other_skill = dict(body, skills=body["skills"][:-1] + [{"name": "Go"}])
+    other_everything = sample_resume(2, section_size)
+    cases = {
+        "unchanged": [body, body],
+        "one_field": [body, other_phone],
+        "one_skill": [body, other_skill],
+        "replace_all": [body, other_everything],
+    }
+
+    for case, versions in cases.items():
+        versions = [schemas.ResumeCreate(**version) for version in versions]
+        state = {"next": 0}
+
+        def update():
+            crud.update_resume(db, resume_id=resume_id, user_id=user_id, resume_data=versions[state["next"]])
+            state["next"] ^= 1
+
+        yield case, time_calls(update, repeat)
+
+
+def bench_serialize_resume(db, user_id: int, section_size: int, repeat: int):
+    import crud
+    import schemas
+
+    crud.create_resumes_bulk(
+        db, [schemas.ResumeCreate(**sample_resume(n, section_size)) for n in range(PAGE_SIZE)], user_id=user_id
+    )
+    resumes, _ = crud.get_resumes_page(db, user_id=user_id, limit=PAGE_SIZE)
+    one = resumes[0]
+
+    # What FastAPI does with a response_model: validate from the ORM object, then dump to JSON
+    yield "one", time_calls(lambda: schemas.Resume.model_validate(one).model_dump_json(), repeat)
+    yield f"page_of_{PAGE_SIZE}", time_calls(
+        lambda: [schemas.Resume.model_validate(resume).model_dump_json() for resume in resumes],
+        max(1, repeat // 10)
+    )
+
+
+def bench_build_prompt(db, user_id: int, section_size: int, repeat: int):
+    import ai_analyzer
+    import crud
+    import schemas
+
+    resume = crud.create_resume(db, schemas.ResumeCreate(**sample_resume(1, section_size)), user_id=user_id)
+    resume = crud.get_resume(db, resume_id=resume.id, user_id=user_id)
+    payload = ai_analyzer.build_resume_payload(resume)
+
+    yield "payload", time_calls(lambda: ai_analyzer.build_resume_payload(resume), repeat)
+    yield "prompt", time_calls(lambda: ai_analyzer.build_prompt(payload, JOB_DESCRIPTION), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--section-sizes", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per case")
+    parser.add_argument("--only", choices=BENCHMARKS, nargs="+", help="run only these benchmarks")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        prepare_environment()
+        import crud
+        import database
+        import models
+        import schemas
+
+        models.Base.metadata.create_all(bind=database.engine)
+        functions = {
+            "update_resume": bench_update_resume,
+            "serialize_resume": bench_serialize_resume,
+            "build_prompt": bench_build_prompt,
+        }
+        metadata = run_metadata()
+
+        with database.SessionLocal() as db:
+            user = crud.create_user(
+                db, schemas.UserCreate(email="micro@example.com", password="unused"), hashed_password="unused"
+            )
+            for name in args.only or BENCHMARKS:
+                for section_size in args.section_sizes:
+                    for case, result in functions[name](db, user.id, section_size, args.repeat):
+                        emit({
+                            "benchmark": f"micro.{name}",
+                            "case": case,
+                            "section_size": section_size,
+                            **result,
+                            "run": metadata,
+                        }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures login throughput (bcrypt verifications per second) for each
+hashing pool mode and cost factor.
+
+Each configuration runs in its own process, because security.py reads
+its settings from environment variables at import time:
+
+    python -m benchmarks.password_hashing --rounds 10 12 --logins 200
+
+Every line of output is one JSON result. 'logins_per_s_per_core' divides
+the throughput by the number of cores the pool could actually use.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import emit, prepare_environment, summarize
+
+POOL_MODES = ["inline", "thread", "process"]
+
+
+async def _run_logins(logins: int, mode: str):
+    """Runs inside the child process: verifies the same password 'logins' times."""
+    prepare_environment()
+    import security
+
+    hashed = security.get_password_hash("correct horse battery staple")
+    latencies = []
+
+    async def one_login():
+        start = time.perf_counter()
+        if mode == "inline":
+            # What the app did before: bcrypt right on the event loop
+            security.verify_and_update_password("correct horse battery staple", hashed)
+        else:
+            await security.verify_and_update_password_async("correct horse battery staple", hashed)
+        latencies.append(time.perf_counter() - start)
+
+    # Warm the pool up (process pools have to start their workers)
+    if mode != "inline":
+        await asyncio.gather(*(one_login() for _ in range(security.PASSWORD_HASH_WORKERS)))
+        latencies.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    cores = 1 if mode == "inline" else min(security.PASSWORD_HASH_WORKERS, os.cpu_count() or 1)
+    result = summarize(latencies, elapsed)
+    result["logins_per_s"] = round(logins / elapsed, 2)
+    result["logins_per_s_per_core"] = round(logins / elapsed / cores, 2)
+    result["cores_used"] = cores
+    return result
+
+
+def run_config(mode: str, rounds: int, args):
+    env = dict(os.environ, BCRYPT_ROUNDS=str(rounds))
+    if mode != "inline":
+        env["PASSWORD_HASH_POOL"] = mode
+    if args.workers:
+        env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.password_hashing", "--child",
+         "--mode", mode, "--logins", str(args.logins)],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result.update({"benchmark": "password_hashing", "mode": mode, "bcrypt_rounds": rounds})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[12], help="bcrypt cost factors to try")
+    parser.add_argument("--modes", nargs="+", choices=POOL_MODES, default=POOL_MODES)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, help="pool size (default: PASSWORD_HASH_WORKERS or CPU count)")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_run_logins(args.logins, args.mode))))
+        return
+
+    for rounds in args.rounds:
+        for mode in args.modes:
+            emit(run_config(mode, rounds, args), args.output)
+
+
+if __name__ == "__main__":
+    main()
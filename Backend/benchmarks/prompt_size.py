@@ -0,0 +1,122 @@
+"""
+Compares the analysis prompt before and after compaction on realistic resumes.
+
+    python -m benchmarks.prompt_size
+
+For each resume size it reports the prompt size in characters and
+estimated tokens for the old (pretty-printed, unbounded) prompt and the
+current one, plus how long building the prompt takes. Output is JSON lines.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import emit, prepare_environment, sample_resume
+
+# A typical posting: long, repetitive, full of blank lines and boilerplate
+JOB_DESCRIPTION = """
+    Senior Backend Engineer  (Remote)
+
+About us:   We are a fast-growing fintech company building the future of payments.
+We value ownership, curiosity and kindness.
+
+What you'll do:
+  - Design, build and operate Python microservices (FastAPI, SQLAlchemy).
+  - Own our PostgreSQL data model and query performance.
+  - Deploy with Docker and Kubernetes on AWS; automate with Terraform.
+  - Work with Kafka and Redis for event-driven pipelines.
+
+Requirements:
+  - 5+ years of professional Python experience.
+  - Strong SQL and PostgreSQL knowledge.
+  - Experience with Docker, Kubernetes and AWS.
+  - Excellent communication skills.
+
+Nice to have:
+  - Kafka, Redis, Terraform.
+  - Experience with payments or fintech.
+
+We value ownership, curiosity and kindness.
+Equal opportunity employer. We do not discriminate on the basis of race, religion, color,
+national origin, gender, sexual orientation, age, marital status, veteran status, or disability status.
+""" * 3
+
+
+def legacy_prompt(resume_data_for_ai: dict, job_description: str):
+    """The prompt exactly as analyze_resume_with_ai used to build it."""
+    return f"""
+    You are an expert career coach and resume optimization bot named 'GROBS.AI'.
+    Your task is to analyze a user's resume against a specific job description.
+
+    First, here is the user's resume data in JSON format:
+    --- RESUME START ---
+    {json.dumps(resume_data_for_ai, indent=2)}
+    --- RESUME END ---
+
+    Next, here is the job description they are applying for:
+    --- JOB DESCRIPTION START ---
+    {job_description}
+    --- JOB DESCRIPTION END ---
+
+    Please provide a critical analysis. Focus on what is missing and how they can improve.
+    Return your analysis *only* in the requested JSON format.
+    """
+
+
+def payload_for(section_size: int):
+    """A resume in the shape of ai_analyzer.build_resume_payload."""
+    resume = sample_resume(1, section_size)
+    return {
+        "full_name": resume["full_name"],
+        "email": resume["email"],
+        "phone": resume["phone"],
+        "linkedin_url": resume["linkedin_url"],
+        "education": [{"school": e["school"], "degree": e["degree"]} for e in resume["education"]],
+        "experience": [
+            {"role": e["role"], "company": e["company"], "responsibilities": e["responsibilities"]}
+            for e in resume["experience"]
+        ],
+        "projects": [{"name": p["project_name"], "description": p["description"]} for p in resume["projects"]],
+        "skills": [s["name"] for s in resume["skills"]],
+    }
+
+
+def time_it(func, repeat: int):
+    """Average time of one call, in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--section-sizes", type=int, nargs="+", default=[1, 3, 6, 12])
+    parser.add_argument("--repeat", type=int, default=200, help="builds per timing")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    args = parser.parse_args()
+
+    prepare_environment()
+    import prompt_builder
+
+    for section_size in args.section_sizes:
+        resume_data = payload_for(section_size)
+        before = legacy_prompt(resume_data, JOB_DESCRIPTION)
+        after, stats = prompt_builder.build_prompt(resume_data, JOB_DESCRIPTION)
+
+        emit({
+            "benchmark": "prompt_size",
+            "section_size": section_size,
+            "before_chars": len(before),
+            "after_chars": len(after),
+            "before_tokens": prompt_builder.estimate_tokens(before),
+            "after_tokens": stats["estimated_tokens"],
+            "reduction_pct": round((1 - len(after) / len(before)) * 100, 1),
+            "truncated": stats["truncated"],
+            "before_build_us": time_it(lambda: legacy_prompt(resume_data, JOB_DESCRIPTION), args.repeat),
+            "after_build_us": time_it(lambda: prompt_builder.build_prompt(resume_data, JOB_DESCRIPTION), args.repeat),
+        }, args.output)
+
+
+if __name__ == "__main__":
+    main()
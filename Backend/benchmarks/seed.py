@@ -0,0 +1,96 @@
+"""
+Fills a database with synthetic users and resumes, so benchmarks (and
+manual testing) run against realistic table sizes.
+
+    python -m benchmarks.seed --users 100 --resumes-per-user 20 --section-size 5
+    python -m benchmarks.seed --database-url sqlite:///./bench.db
+
+By default it seeds the app's own database (grobs.db, or DATABASE_URL).
+Every user gets the same password (--password), which is hashed only once.
+The output is one JSON line.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import emit, prepare_environment, run_metadata, sample_resume
+
+# Resumes are inserted in chunks of this many (one transaction each)
+CHUNK_SIZE = 200
+DEFAULT_PASSWORD = "bench-password"
+
+
+def seed_email(n: int):
+    return f"seed{n}@example.com"
+
+
+def seed(db, users: int, resumes_per_user: int, section_size: int, password: str = DEFAULT_PASSWORD, first_user: int = 0):
+    """
+    Creates the users (skipping ones that already exist) and their resumes.
+    Returns a list of (email, user_id).
+    """
+    import crud
+    import schemas
+    import security
+
+    # bcrypt is slow on purpose, and every seeded user shares a password anyway
+    hashed_password = security.get_password_hash(password)
+
+    seeded = []
+    for n in range(first_user, first_user + users):
+        email = seed_email(n)
+        db_user = crud.get_user_by_email(db, email)
+        if db_user is None:
+            db_user = crud.create_user(
+                db, schemas.UserCreate(email=email, password=password), hashed_password=hashed_password
+            )
+
+        resumes = [
+            schemas.ResumeCreate(**sample_resume(n * resumes_per_user + i, section_size))
+            for i in range(resumes_per_user)
+        ]
+        for start in range(0, len(resumes), CHUNK_SIZE):
+            crud.create_resumes_bulk(db, resumes[start:start + CHUNK_SIZE], user_id=db_user.id)
+        seeded.append((email, db_user.id))
+    return seeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--resumes-per-user", type=int, default=10)
+    parser.add_argument("--section-size", type=int, default=3, help="items per resume section")
+    parser.add_argument("--first-user", type=int, default=0, help="number of the first seed user (to add more later)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--database-url", help="seed this database instead of the app's")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    prepare_environment()
+    import database
+    import models
+
+    models.Base.metadata.create_all(bind=database.engine)
+    database.add_missing_columns()
+
+    start = time.perf_counter()
+    with database.SessionLocal() as db:
+        seeded = seed(db, args.users, args.resumes_per_user, args.section_size, args.password, args.first_user)
+    elapsed = time.perf_counter() - start
+
+    emit({
+        "benchmark": "seed",
+        "database_url": database.SQLALCHEMY_DATABASE_URL,
+        "users": len(seeded),
+        "resumes": len(seeded) * args.resumes_per_user,
+        "section_size": args.section_size,
+        "elapsed_s": round(elapsed, 3),
+        "resumes_per_s": round(len(seeded) * args.resumes_per_user / elapsed, 1) if elapsed else None,
+        "run": run_metadata(),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
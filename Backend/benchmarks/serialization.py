@@ -0,0 +1,100 @@
+"""
+Compares the two ways of turning a page of resumes into a JSON response:
+
+- orm: load ORM objects (selectinload), validate them with schemas.Resume,
+  dump and encode with the json module (what FastAPI's response_model does,
+  and what GET /resumes/ used to do)
+- fast: select plain row tuples, build dicts (crud.resume_dicts) and encode
+  with orjson (fast_json.py, what GET /resumes/ does now)
+
+    python -m benchmarks.serialization --page-sizes 10 100 500 --section-size 5
+
+For each page size it reports the whole path (DB + serialization) and the
+serialization alone, and checks both produce the same JSON. Output is JSON lines.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import emit, prepare_environment, run_metadata, sample_resume, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--section-size", type=int, default=3, help="items per resume section")
+    parser.add_argument("--repeat", type=int, default=30, help="timed calls per case")
+    parser.add_argument("--output", help="append JSON lines to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        prepare_environment()
+        import crud
+        import database
+        import fast_json
+        import models
+        import schemas
+
+        models.Base.metadata.create_all(bind=database.engine)
+        metadata = run_metadata()
+
+        with database.SessionLocal() as db:
+            user = crud.create_user(
+                db, schemas.UserCreate(email="serialize@example.com", password="unused"), hashed_password="unused"
+            )
+            crud.create_resumes_bulk(
+                db, [schemas.ResumeCreate(**sample_resume(n, args.section_size)) for n in range(max(args.page_sizes))],
+                user_id=user.id
+            )
+
+            def orm_encode(resumes):
+                data = [schemas.Resume.model_validate(resume).model_dump(mode="json") for resume in resumes]
+                return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+            def orm_path(page_size):
+                # A fresh session each time, like a request, so nothing is served from the identity map
+                with database.SessionLocal() as request_db:
+                    resumes, _ = crud.get_resumes_page(request_db, user_id=user.id, limit=page_size)
+                    return orm_encode(resumes)
+
+            def fast_path(page_size):
+                with database.SessionLocal() as request_db:
+                    rows, _ = crud.get_resume_rows_page(request_db, user_id=user.id, limit=page_size)
+                    return fast_json.dumps(crud.resume_dicts(request_db, rows))
+
+            for page_size in args.page_sizes:
+                same_output = json.loads(orm_path(page_size)) == json.loads(fast_path(page_size))
+
+                # Serialization alone, on data that's already loaded
+                resumes, _ = crud.get_resumes_page(db, user_id=user.id, limit=page_size)
+                rows, _ = crud.get_resume_rows_page(db, user_id=user.id, limit=page_size)
+                dicts = crud.resume_dicts(db, rows)
+
+                cases = {
+                    ("orm", "end_to_end"): lambda: orm_path(page_size),
+                    ("fast", "end_to_end"): lambda: fast_path(page_size),
+                    ("orm", "encode_only"): lambda: orm_encode(resumes),
+                    ("fast", "encode_only"): lambda: fast_json.dumps(dicts),
+                }
+                results = {case: time_calls(func, args.repeat) for case, func in cases.items()}
+
+                for (path, scope), result in results.items():
+                    other = results[("orm", scope)]
+                    emit({
+                        "benchmark": "serialization",
+                        "path": path,
+                        "scope": scope,
+                        "page_size": page_size,
+                        "section_size": args.section_size,
+                        "same_output": same_output,
+                        "speedup_vs_orm": round(other["p50_ms"] / result["p50_ms"], 2) if result["p50_ms"] else None,
+                        "orjson": fast_json.orjson is not None,
+                        **result,
+                        "run": metadata,
+                    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
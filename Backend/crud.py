@@ -1,7 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, select, update, insert
+from datetime import datetime, timedelta, timezone
 import models
 import schemas
 import security
+import json
+import analysis_cache
+import user_cache
+import search_index
+import resume_documents
 
 # --- User CRUD (No Changes) ---
 
@@ -9,9 +17,13 @@ def get_user_by_email(db: Session, email: str):
     """Looks up a user by their email address."""
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    """Creates a new user in the database."""
-    hashed_password = security.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str | None = None):
+    """
+    Creates a new user in the database.
+    Pass 'hashed_password' if you already hashed the password (e.g. in the hashing pool).
+    """
+    if hashed_password is None:
+        hashed_password = security.get_password_hash(user.password)
     db_user = models.User(
         email=user.email, 
         hashed_password=hashed_password
@@ -19,17 +31,95 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    # Make sure no stale copy of this email is left in the user cache
+    user_cache.invalidate(db_user.email)
     return db_user
 
+def update_user_password_hash(db: Session, user: models.User, hashed_password: str):
+    """Saves a new hash for a user's password (e.g. after the cost factor changed)."""
+    user.hashed_password = hashed_password
+    db.commit()
+    user_cache.invalidate(user.email)
+    return user
+
 # --- NEW: Resume CRUD ---
 
-def create_resume(db: Session, resume_data: schemas.ResumeCreate, user_id: int):
+def _with_sections(query):
     """
-    Creates a full resume with all nested data for a specific user.
+    Eager-loads every section of the resumes in a query.
+    'selectinload' runs ONE extra query per section for ALL the resumes,
+    so loading 1 or 50 resumes always costs 5 queries instead of 1 + 4 per resume.
+    In document storage mode the sections are in the resume row already, so
+    nothing is loaded (resumes not migrated yet load theirs when they're read).
     """
-    
-    # 1. Create the main Resume object
-    # We unpack the personal info from the resume_data
+    if resume_documents.use_documents():
+        return query
+    return _with_section_tables(query)
+
+def _with_section_tables(query):
+    return query.options(
+        selectinload(models.Resume.education),
+        selectinload(models.Resume.experience),
+        selectinload(models.Resume.projects),
+        selectinload(models.Resume.skills),
+    )
+
+def _set_summary_fields(db_resume: models.Resume, sections):
+    """
+    Keeps the section counts and the updated-at stamp on the resume row in sync,
+    so list views never need to read the section tables.
+    'sections' is anything with education/experience/projects/skills lists
+    (the incoming ResumeCreate, or the resume itself).
+    """
+    db_resume.education_count = len(sections.education)
+    db_resume.experience_count = len(sections.experience)
+    db_resume.project_count = len(sections.projects)
+    db_resume.skill_count = len(sections.skills)
+    db_resume.updated_at = datetime.now(timezone.utc)
+
+def backfill_section_counts(db: Session):
+    """
+    Fills in the section counts for resumes created before those columns existed.
+    Only touches rows that are missing them, so it's cheap to run on every startup.
+    """
+    def count_of(section_model):
+        return (
+            select(func.count(section_model.id))
+            .where(section_model.resume_id == models.Resume.id)
+            .scalar_subquery()
+        )
+
+    db.execute(
+        update(models.Resume)
+        .where(models.Resume.education_count.is_(None))
+        .values(
+            education_count=count_of(models.Education),
+            experience_count=count_of(models.Experience),
+            project_count=count_of(models.Project),
+            skill_count=count_of(models.Skill),
+        )
+    )
+    db.commit()
+
+def _paginate(query, id_column, limit: int, cursor: int | None, newest_first: bool = False):
+    """
+    Keyset (cursor) pagination on an id column.
+    Instead of OFFSET (which gets slower on every page) we ask for the rows
+    *after* the last id the client saw. Returns (rows, next_cursor).
+    """
+    if cursor is not None:
+        query = query.filter(id_column < cursor if newest_first else id_column > cursor)
+
+    # We fetch one extra row just to know if there is a next page
+    order = id_column.desc() if newest_first else id_column
+    rows = query.order_by(order).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+def _new_resume_row(resume_data: schemas.ResumeCreate, user_id: int):
+    """Builds the main Resume object (personal info only) for new resume data."""
     db_resume = models.Resume(
         full_name=resume_data.full_name,
         email=resume_data.email,
@@ -38,126 +128,661 @@ def create_resume(db: Session, resume_data: schemas.ResumeCreate, user_id: int):
         template_name=resume_data.template_name,
         owner_id=user_id  # Link it to the logged-in user
     )
+    _set_summary_fields(db_resume, resume_data)
+    return db_resume
+
+def _bulk_insert_sections(db: Session, new_resumes: list):
+    """
+    Inserts the sections of many new resumes with one executemany per table.
+    'new_resumes' is a list of (db_resume, resume_data) pairs; each db_resume
+    must already have its ID (i.e. be flushed).
+    """
+    for section, section_model in RESUME_SECTIONS.items():
+        rows = [
+            {**item.dict(), "resume_id": db_resume.id}
+            for db_resume, resume_data in new_resumes
+            for item in getattr(resume_data, section)
+        ]
+        if rows:
+            db.execute(insert(section_model), rows)
+
+def _store_sections(db: Session, new_resumes: list):
+    """
+    Saves the sections of new resumes: as one document per resume in
+    document storage mode, otherwise in the section tables.
+    'new_resumes' is a list of (db_resume, resume_data) pairs.
+    """
+    if resume_documents.use_documents():
+        for db_resume, resume_data in new_resumes:
+            db_resume.document = resume_documents.encode(resume_documents.sections_of(resume_data))
+    else:
+        _bulk_insert_sections(db, new_resumes)
+
+def create_resume(db: Session, resume_data: schemas.ResumeCreate, user_id: int):
+    """
+    Creates a full resume with all nested data for a specific user.
+    Everything is saved in a single transaction.
+    """
     
-    # 2. Add it to the session to get an ID
+    # 1. Create the main Resume object
+    db_resume = _new_resume_row(resume_data, user_id)
+    
+    # 2. Flush (not commit) to get its ID from the database
     db.add(db_resume)
-    db.commit()
-    db.refresh(db_resume)
+    db.flush()
     
-    # 3. Create all the Education entries
-    for edu_data in resume_data.education:
-        db_edu = models.Education(
-            **edu_data.dict(), # Unpack the education data
-            resume_id=db_resume.id # Link it to the new resume
-        )
-        db.add(db_edu)
+    # 3. Save all the education, experience, project and skill rows in bulk (or the document)
+    _store_sections(db, [(db_resume, resume_data)])
+    search_index.index_resume(db, db_resume.id, user_id, resume_data)
         
-    # 4. Create all the Experience entries
-    for exp_data in resume_data.experience:
-        db_exp = models.Experience(
-            **exp_data.dict(), # Unpack the experience data
-            resume_id=db_resume.id # Link it to the new resume
-        )
-        db.add(db_exp)
+    # 4. Commit everything at once
+    db.commit()
+    
+    return resume_documents.readable(db_resume)
 
-    # 5. Create all the Project entries
-    for proj_data in resume_data.projects:
-        db_proj = models.Project(
-            **proj_data.dict(), # Unpack the project data
-            resume_id=db_resume.id # Link it to the new resume
-        )
-        db.add(db_proj)
+def create_resumes_bulk(db: Session, resumes_data: list[schemas.ResumeCreate], user_id: int):
+    """
+    Creates many resumes for a user in one transaction (e.g. when importing).
+    Returns the IDs of the new resumes.
+    """
+    db_resumes = [_new_resume_row(resume_data, user_id) for resume_data in resumes_data]
 
-    for skill_data in resume_data.skills:
-        db_skill = models.Skill(
-            **skill_data.dict(),
-            resume_id=db_resume.id
-        )
-        db.add(db_skill)
-        
-    # 6. Commit all the new entries (education, exp, projects)
+    # One flush inserts all the resume rows and gives us their IDs
+    db.add_all(db_resumes)
+    db.flush()
+
+    _store_sections(db, list(zip(db_resumes, resumes_data)))
+    for db_resume, resume_data in zip(db_resumes, resumes_data):
+        search_index.index_resume(db, db_resume.id, user_id, resume_data)
+
+    # Read the IDs before committing, since the commit expires the objects
+    new_ids = [db_resume.id for db_resume in db_resumes]
     db.commit()
-    db.refresh(db_resume)
-    
-    return db_resume
+    return new_ids
 
 def get_resumes_by_owner(db: Session, user_id: int):
     """
     Gets all resumes owned by a specific user.
     """
-    return db.query(models.Resume).filter(models.Resume.owner_id == user_id).all()
+    resumes = _with_sections(db.query(models.Resume)).filter(models.Resume.owner_id == user_id).all()
+    return [resume_documents.readable(resume) for resume in resumes]
 
-def get_resume(db: Session, resume_id: int, user_id: int):
+def get_resumes_page(db: Session, user_id: int, limit: int, cursor: int | None = None):
     """
-    Gets a single resume by its ID,
-    ensuring it belongs to the correct user.
+    Gets one page of full resumes owned by a user.
+    Returns (resumes, next_cursor).
+    """
+    query = _with_sections(db.query(models.Resume)).filter(models.Resume.owner_id == user_id)
+    resumes, next_cursor = _paginate(query, models.Resume.id, limit=limit, cursor=cursor)
+    return [resume_documents.readable(resume) for resume in resumes], next_cursor
+
+def get_resume_summaries(db: Session, user_id: int, limit: int, cursor: int | None = None):
+    """
+    Gets one page of resume summaries owned by a user.
+    This only selects columns from the 'resumes' table, so no ORM objects
+    are built and the section tables are never read.
+    Returns (rows, next_cursor).
+    """
+    query = db.query(
+        models.Resume.id,
+        models.Resume.full_name,
+        models.Resume.template_name,
+        models.Resume.education_count,
+        models.Resume.experience_count,
+        models.Resume.project_count,
+        models.Resume.skill_count,
+        models.Resume.updated_at,
+    ).filter(models.Resume.owner_id == user_id)
+    return _paginate(query, models.Resume.id, limit=limit, cursor=cursor)
+
+def get_resumes_by_ids(db: Session, resume_ids: list[int], user_id: int):
     """
-    return db.query(models.Resume).filter(
+    Gets several resumes (with all their sections) by ID,
+    ensuring they all belong to the correct user.
+    """
+    resumes = _with_sections(db.query(models.Resume)).filter(
+        models.Resume.id.in_(resume_ids),
+        models.Resume.owner_id == user_id
+    ).all()
+    return [resume_documents.readable(resume) for resume in resumes]
+
+def get_resume_names(db: Session, resume_ids: list[int]):
+    """Returns {resume_id: full_name} for the given resumes."""
+    rows = db.query(models.Resume.id, models.Resume.full_name).filter(
+        models.Resume.id.in_(resume_ids)
+    )
+    return {row.id: row.full_name for row in rows}
+
+def _get_resume_row(db: Session, resume_id: int, user_id: int):
+    """The resume's ORM row (for writing to it), ensuring it belongs to the correct user."""
+    return _with_sections(db.query(models.Resume)).filter(
         models.Resume.id == resume_id,
         models.Resume.owner_id == user_id
     ).first()
 
+def get_resume(db: Session, resume_id: int, user_id: int):
+    """
+    Gets a single resume by its ID,
+    ensuring it belongs to the correct user.
+    """
+    return resume_documents.readable(_get_resume_row(db, resume_id=resume_id, user_id=user_id))
+
 def delete_resume(db: Session, resume_id: int, user_id: int):
     # Find the resume first
-    db_resume = get_resume(db=db, resume_id=resume_id, user_id=user_id)
+    db_resume = _get_resume_row(db=db, resume_id=resume_id, user_id=user_id)
     
     if db_resume is None:
         return None
     
-    # Now delete it
+    # Now delete it (and any cached analyses of it)
+    analysis_cache.invalidate_resume(db, resume_id=resume_id)
+    search_index.remove_resume(db, resume_id=resume_id)
+    db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.resume_id == resume_id
+    ).delete(synchronize_session=False)
+    db.query(models.AnalysisRecord).filter(
+        models.AnalysisRecord.resume_id == resume_id
+    ).delete(synchronize_session=False)
     db.delete(db_resume)
     db.commit()
     
     return db_resume # Return the object we deleted
 
 
+# --- Differential updates ---
+
+# The personal info columns we copy straight onto the resume row
+RESUME_FIELDS = ["full_name", "email", "phone", "linkedin_url", "template_name"]
+# These can't be cleared, so a null in a PATCH means "leave it alone"
+REQUIRED_RESUME_FIELDS = {"full_name", "email", "template_name"}
+
+# Each section: (relationship name on Resume, model class)
+RESUME_SECTIONS = {
+    "education": models.Education,
+    "experience": models.Experience,
+    "projects": models.Project,
+    "skills": models.Skill,
+}
+
+def _sync_section(collection, incoming: list[dict], section_model):
+    """
+    Makes a section collection match the incoming list, touching as few rows as possible.
+    Returns True if anything changed (a pure reorder counts).
+
+    Sections are read back in id order, so the order has to survive:
+    1. Existing rows (in id order) are paired with the incoming items by position,
+       and only their changed columns are updated.
+    2. Anything left over is a real addition at the end (insert) or removal (delete).
+    """
+    fields = [
+        column.name for column in section_model.__table__.columns
+        if column.name not in ("id", "resume_id")
+    ]
+    rows = sorted(collection, key=lambda row: row.id)
+    changed = False
+
+    # 1. Update changed columns on paired rows
+    for row, item in zip(rows, incoming):
+        for field in fields:
+            value = item.get(field)
+            if getattr(row, field) != value:
+                setattr(row, field, value)
+                changed = True
+
+    # 2. Delete real removals, insert real additions
+    # (removing from the collection deletes the row thanks to "delete-orphan")
+    for row in rows[len(incoming):]:
+        collection.remove(row)
+        changed = True
+    for item in incoming[len(rows):]:
+        collection.append(section_model(**{field: item.get(field) for field in fields}))
+        changed = True
+
+    return changed
+
+def _apply_resume_changes(db: Session, db_resume: models.Resume, changes: dict):
+    """
+    Applies a dict of changes (personal info and/or whole sections) to a resume.
+    Sections that are not in 'changes' are left untouched. Returns True if anything changed.
+    """
+    changed = False
+
+    # 1. Personal info
+    for field in RESUME_FIELDS:
+        if field not in changes:
+            continue
+        value = changes[field]
+        if value is None and field in REQUIRED_RESUME_FIELDS:
+            continue
+        if getattr(db_resume, field) != value:
+            setattr(db_resume, field, value)
+            changed = True
+
+    # 2. Sections
+    # (a resume still in the tables moves into a document the first time it's written)
+    if db_resume.document is None and resume_documents.use_documents():
+        move_sections_to_document(db_resume)
+        changed = True
+    if db_resume.document is not None:
+        sections = _apply_document_changes(db_resume, changes)
+        changed = sections.changed or changed
+    else:
+        sections = db_resume
+        for section, section_model in RESUME_SECTIONS.items():
+            if changes.get(section) is None:
+                continue
+            if _sync_section(getattr(db_resume, section), changes[section], section_model):
+                changed = True
+
+    if changed:
+        # Cached analyses of the old version are no longer valid
+        analysis_cache.invalidate_resume(db, resume_id=db_resume.id)
+        _set_summary_fields(db_resume, sections)
+        # Bumped in SQL, so two updates at the same time can't both write the same number
+        db_resume.revision = func.coalesce(models.Resume.revision, 0) + 1
+        search_index.index_resume(db, db_resume.id, db_resume.owner_id, sections)
+
+    return changed
+
+def _apply_document_changes(db_resume: models.Resume, changes: dict):
+    """
+    Replaces the sections in 'changes' in a document-stored resume.
+    Returns a ResumeView of the result, with a 'changed' flag.
+    """
+    document = resume_documents.decode(db_resume.document)
+    changed = False
+    for section, fields in resume_documents.SECTION_FIELDS.items():
+        if changes.get(section) is None:
+            continue
+        incoming = [{field: item.get(field) for field in fields} for item in changes[section]]
+        if incoming != document.get(section, []):
+            document[section] = incoming
+            changed = True
+
+    if changed:
+        db_resume.document = resume_documents.encode(document)
+    sections = resume_documents.ResumeView(db_resume, document)
+    sections.changed = changed
+    return sections
+
 def update_resume(db: Session, resume_id: int, user_id: int, resume_data: schemas.ResumeCreate):
     """
     Updates an existing resume.
+    Instead of deleting and re-creating every section, this only writes
+    the rows that really changed, all in one transaction.
     """
     
-    # 1. Get the existing resume
-    db_resume = get_resume(db=db, resume_id=resume_id, user_id=user_id)
+    # 1. Get the existing resume (with all its sections)
+    db_resume = _get_resume_row(db=db, resume_id=resume_id, user_id=user_id)
     
     if not db_resume:
         return None # Resume not found or user doesn't own it
 
-    # 2. Delete all old children data
-    # (SQLAlchemy's "cascade" will handle this from the resume object)
-    db_resume.education = []
-    db_resume.experience = []
-    db_resume.projects = []
-    db_resume.skills = []
-    
-    # We commit here to clear the old relationships
-    db.commit()
+    # 2. Diff the new data against what we have
+    _apply_resume_changes(db, db_resume, resume_data.dict())
 
-    # 3. Update the main resume (Personal Info)
-    db_resume.full_name = resume_data.full_name
-    db_resume.email = resume_data.email
-    db_resume.phone = resume_data.phone
-    db_resume.linkedin_url = resume_data.linkedin_url
-    db_resume.template_name = resume_data.template_name
+    # 3. Commit all the changes at once
+    db.commit()
+    db.refresh(db_resume)
     
-    # 4. Add all the new children, just like in create_resume
-    for edu_data in resume_data.education:
-        db_edu = models.Education(**edu_data.dict(), resume_id=db_resume.id)
-        db.add(db_edu)
-        
-    for exp_data in resume_data.experience:
-        db_exp = models.Experience(**exp_data.dict(), resume_id=db_resume.id)
-        db.add(db_exp)
+    return resume_documents.readable(db_resume)
+
+def patch_resume(db: Session, resume_id: int, user_id: int, patch_data: schemas.ResumePatch):
+    """
+    Partially updates an existing resume.
+    Only the fields and sections that were sent are changed.
+    """
+    db_resume = _get_resume_row(db=db, resume_id=resume_id, user_id=user_id)
+
+    if not db_resume:
+        return None
+
+    _apply_resume_changes(db, db_resume, patch_data.dict(exclude_unset=True))
 
-    for proj_data in resume_data.projects:
-        db_proj = models.Project(**proj_data.dict(), resume_id=db_resume.id)
-        db.add(db_proj)
-        
-    for skill_data in resume_data.skills:
-        db_skill = models.Skill(**skill_data.dict(), resume_id=db_resume.id)
-        db.add(db_skill)
-            
-    # 5. Commit all the changes
     db.commit()
     db.refresh(db_resume)
-    
-    return db_resume
\ No newline at end of file
+
+    return resume_documents.readable(db_resume)
+
+
+
+# --- Fast read path ---
+# Reading resumes as ORM objects and validating them with schemas.Resume is
+# the slow part of the list endpoints. Here we select only the columns the
+# API returns, as plain tuples, and build the JSON-ready dicts ourselves.
+# The field lists come from the schemas, so the output has the same shape.
+
+_SECTION_SCHEMAS = {
+    "education": schemas.Education,
+    "experience": schemas.Experience,
+    "projects": schemas.Project,
+    "skills": schemas.Skill,
+}
+# The top-level fields of a resume, in schemas.Resume order
+_RESUME_OUTPUT_FIELDS = list(schemas.Resume.model_fields)
+_RESUME_COLUMN_FIELDS = [name for name in _RESUME_OUTPUT_FIELDS if name not in _SECTION_SCHEMAS]
+# Selected after the output columns: what resume ETags are made from
+_RESUME_VERSION_FIELDS = ["revision", "updated_at"]
+
+def _resume_rows_query(db: Session):
+    return db.query(*[
+        getattr(models.Resume, name) for name in _RESUME_COLUMN_FIELDS + _RESUME_VERSION_FIELDS
+    ], models.Resume.document)
+
+def get_resume_row(db: Session, resume_id: int, user_id: int):
+    """
+    Gets one resume's own columns (no sections) as a row, or None.
+    The row has id, revision and updated_at, so it's enough to build the ETag.
+    """
+    return _resume_rows_query(db).filter(
+        models.Resume.id == resume_id,
+        models.Resume.owner_id == user_id
+    ).first()
+
+def get_resume_rows_page(db: Session, user_id: int, limit: int, cursor: int | None = None):
+    """
+    The rows for one page of a user's resumes (no sections), like get_resumes_page.
+    Returns (rows, next_cursor).
+    """
+    query = _resume_rows_query(db).filter(models.Resume.owner_id == user_id)
+    return _paginate(query, models.Resume.id, limit=limit, cursor=cursor)
+
+def _document_item(item: dict, number: int, resume_id: int, schema):
+    """The values of a document item in the schema's field order (ids included)."""
+    for name in schema.model_fields:
+        if name == "id":
+            yield number
+        elif name == "resume_id":
+            yield resume_id
+        else:
+            yield item.get(name)
+
+def resume_dicts(db: Session, rows):
+    """
+    Turns rows from get_resume_row(s_page) into schemas.Resume-shaped dicts,
+    reading each section table once (columns only) for all of them.
+    Document-stored resumes are built from their document, with no extra queries.
+    """
+    resumes = {}
+    table_stored = []
+    for row in rows:
+        values = dict(zip(_RESUME_COLUMN_FIELDS, row))
+        resumes[row.id] = {
+            name: [] if name in _SECTION_SCHEMAS else values[name] for name in _RESUME_OUTPUT_FIELDS
+        }
+        if row.document is None:
+            table_stored.append(row.id)
+        else:
+            document = resume_documents.decode(row.document)
+            for section, schema in _SECTION_SCHEMAS.items():
+                resumes[row.id][section] = [
+                    # Same keys, in the same order, as the table-stored items
+                    {name: value for name, value in zip(schema.model_fields, _document_item(item, number, row.id, schema))}
+                    for number, item in enumerate(document.get(section, []), start=1)
+                ]
+    if not table_stored:
+        return list(resumes.values())
+
+    for section, schema in _SECTION_SCHEMAS.items():
+        fields = list(schema.model_fields)
+        section_model = RESUME_SECTIONS[section]
+        section_rows = db.query(*[getattr(section_model, name) for name in fields]).filter(
+            section_model.resume_id.in_(table_stored)
+        ).order_by(section_model.id)
+        for section_row in section_rows:
+            item = dict(zip(fields, section_row))
+            resumes[item["resume_id"]][section].append(item)
+
+    return list(resumes.values())
+
+
+# --- NEW: Resume Storage Migration ---
+# Moves resumes between the section tables and documents (see resume_documents.py).
+# Section item ids change when a resume moves (documents number items 1, 2, 3...),
+# so both directions bump the revision.
+
+def move_sections_to_document(db_resume: models.Resume):
+    """Stores a table-stored resume's sections as a document and deletes the section rows."""
+    db_resume.document = resume_documents.encode(resume_documents.sections_of(db_resume))
+    for section in RESUME_SECTIONS:
+        # delete-orphan removes the rows
+        getattr(db_resume, section).clear()
+
+def move_document_to_sections(db: Session, db_resume: models.Resume):
+    """Stores a document-stored resume's sections in the section tables again."""
+    document = resume_documents.decode(db_resume.document)
+    for section, section_model in RESUME_SECTIONS.items():
+        rows = [{**item, "resume_id": db_resume.id} for item in document.get(section, [])]
+        if rows:
+            db.execute(insert(section_model), rows)
+    db_resume.document = None
+
+def migrate_resume_storage(db: Session, to: str, batch_size: int = 200, recompress: bool = False):
+    """
+    Moves every resume to the given storage ("document" or "tables"),
+    'batch_size' resumes per transaction. With 'recompress', documents stored
+    with other compression settings are re-encoded too.
+    Safe to stop and run again: it only picks up resumes that still need moving.
+    Returns how many resumes were moved and how many were only re-encoded.
+    """
+    if to not in ("document", "tables"):
+        raise ValueError(f"Unknown storage '{to}'. Use 'document' or 'tables'.")
+
+    moved = 0
+    recompressed = 0
+    last_id = 0
+    while True:
+        # 1. Next batch, by id (keyset), so each batch is one cheap indexed query
+        query = db.query(models.Resume).filter(models.Resume.id > last_id)
+        if to == "document":
+            query = _with_section_tables(query)
+            if not recompress:
+                query = query.filter(models.Resume.document.is_(None))
+        else:
+            query = query.filter(models.Resume.document.is_not(None))
+        batch = query.order_by(models.Resume.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        # 2. Move (or re-encode) each resume
+        for db_resume in batch:
+            if to == "tables":
+                move_document_to_sections(db, db_resume)
+            elif db_resume.document is None:
+                move_sections_to_document(db_resume)
+            elif not resume_documents.is_current_encoding(db_resume.document):
+                # Same content, so the revision (and the ETag) stays
+                db_resume.document = resume_documents.encode(resume_documents.decode(db_resume.document))
+                recompressed += 1
+                continue
+            else:
+                continue
+            db_resume.revision = func.coalesce(models.Resume.revision, 0) + 1
+            moved += 1
+
+        # 3. One commit per batch keeps transactions (and locks) short
+        db.commit()
+        db.expunge_all()
+
+    return {"moved": moved, "recompressed": recompressed}
+
+
+# --- NEW: Analysis Job CRUD ---
+
+def create_analysis_job(db: Session, resume_id: int, user_id: int, job_description: str):
+    """Queues a new background analysis."""
+    db_job = models.AnalysisJob(
+        owner_id=user_id,
+        resume_id=resume_id,
+        job_description=job_description,
+        status="queued"
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_analysis_job(db: Session, job_id: int, user_id: int):
+    """Gets one job, ensuring it belongs to the correct user."""
+    return db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == job_id,
+        models.AnalysisJob.owner_id == user_id
+    ).first()
+
+def get_analysis_jobs_for_resume(db: Session, resume_id: int, user_id: int, limit: int = 50):
+    """Gets the most recent jobs for one of the user's resumes, newest first."""
+    return db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.resume_id == resume_id,
+        models.AnalysisJob.owner_id == user_id
+    ).order_by(models.AnalysisJob.id.desc()).limit(limit).all()
+
+def claim_next_analysis_job(db: Session, running_per_owner: dict):
+    """
+    Picks the next job to run and marks it 'running'. Returns it, or None if the queue is empty.
+
+    Fairness: among users with queued jobs, the one with the fewest jobs
+    running right now goes first (oldest job breaks ties), so one user
+    queueing 50 analyses can't starve everyone else.
+    """
+    # The oldest queued job of every user who is waiting
+    oldest_per_owner = (
+        db.query(models.AnalysisJob.owner_id, func.min(models.AnalysisJob.id).label("job_id"))
+        .filter(models.AnalysisJob.status == "queued")
+        .group_by(models.AnalysisJob.owner_id)
+        .all()
+    )
+
+    candidates = sorted(oldest_per_owner, key=lambda row: (running_per_owner.get(row.owner_id, 0), row.job_id))
+    for row in candidates:
+        # Only claim it if no other worker got there first
+        claimed = db.query(models.AnalysisJob).filter(
+            models.AnalysisJob.id == row.job_id,
+            models.AnalysisJob.status == "queued"
+        ).update(
+            {"status": "running", "started_at": datetime.now(timezone.utc), "heartbeat_at": datetime.now(timezone.utc)},
+            synchronize_session=False
+        )
+        db.commit()
+        if claimed:
+            return db.get(models.AnalysisJob, row.job_id)
+    return None
+
+def finish_analysis_job(db: Session, db_job: models.AnalysisJob, result: dict | None = None, error: str | None = None):
+    """Stores a job's result (or error) and marks it done (or failed)."""
+    db_job.status = "failed" if error else "done"
+    db_job.result = json.dumps(result) if result is not None else None
+    db_job.error = error
+    db_job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    return db_job
+
+def renew_analysis_job_lease(db: Session, job_id: int):
+    """Tells other workers this running job is still alive."""
+    db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == job_id,
+        models.AnalysisJob.status == "running"
+    ).update({"heartbeat_at": datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+
+def requeue_expired_analysis_jobs(db: Session, lease_seconds: float):
+    """
+    Puts 'running' jobs whose worker stopped renewing their lease (it crashed,
+    or the server was stopped) back in the queue. Jobs that another live
+    process is running keep their lease fresh, so they're left alone.
+    Returns how many jobs were requeued.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lease_seconds)
+    requeued = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.status == "running",
+        # (jobs from before leases existed only have started_at)
+        func.coalesce(models.AnalysisJob.heartbeat_at, models.AnalysisJob.started_at) < cutoff
+    ).update({"status": "queued", "started_at": None, "heartbeat_at": None}, synchronize_session=False)
+    db.commit()
+    return requeued
+
+
+# --- NEW: Analysis History CRUD ---
+
+def get_job_description_by_text(db: Session, text: str):
+    """Finds a stored job description by content (whitespace and case don't matter)."""
+    return db.query(models.JobDescription).filter(
+        models.JobDescription.content_hash == analysis_cache.hash_job_description(text)
+    ).first()
+
+def get_or_create_job_description(db: Session, text: str):
+    """Returns the stored copy of this job description, storing it first if it's new."""
+    db_jd = get_job_description_by_text(db, text)
+    if db_jd is not None:
+        return db_jd
+
+    db_jd = models.JobDescription(content_hash=analysis_cache.hash_job_description(text), text=text)
+    db.add(db_jd)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Someone else stored the same JD at the same moment: use theirs
+        db.rollback()
+        return get_job_description_by_text(db, text)
+    return db_jd
+
+def get_latest_analysis(db: Session, resume_id: int, user_id: int, job_description_id: int):
+    """The most recent stored analysis of a resume against a job description."""
+    return db.query(models.AnalysisRecord).filter(
+        models.AnalysisRecord.resume_id == resume_id,
+        models.AnalysisRecord.job_description_id == job_description_id,
+        models.AnalysisRecord.owner_id == user_id
+    ).order_by(models.AnalysisRecord.id.desc()).first()
+
+def record_analysis(
+    db: Session, resume_id: int, user_id: int, resume_data: dict,
+    job_description: str, result: dict, model_name: str
+):
+    """
+    Adds an analysis to the history and returns it.
+    If the latest stored analysis of this resume + JD already is this one
+    (same resume data, same model, same result), that row is returned
+    instead of storing a duplicate.
+    """
+    db_jd = get_or_create_job_description(db, job_description)
+    resume_hash = analysis_cache.hash_resume_payload(resume_data)
+    result_json = json.dumps(result)
+
+    latest = get_latest_analysis(db, resume_id=resume_id, user_id=user_id, job_description_id=db_jd.id)
+    if (
+        latest is not None
+        and latest.resume_hash == resume_hash
+        and latest.model_name == model_name
+        and latest.result == result_json
+    ):
+        return latest
+
+    db_record = models.AnalysisRecord(
+        owner_id=user_id,
+        resume_id=resume_id,
+        job_description_id=db_jd.id,
+        resume_hash=resume_hash,
+        model_name=model_name,
+        score=result["score"],
+        result=result_json
+    )
+    db.add(db_record)
+    db.commit()
+    db.refresh(db_record)
+    return db_record
+
+def get_analyses_for_resume(db: Session, resume_id: int, user_id: int, limit: int, cursor: int | None = None):
+    """One page of a resume's analysis history, newest first. Returns (analyses, next_cursor)."""
+    query = db.query(models.AnalysisRecord).filter(
+        models.AnalysisRecord.resume_id == resume_id,
+        models.AnalysisRecord.owner_id == user_id
+    )
+    return _paginate(query, models.AnalysisRecord.id, limit, cursor, newest_first=True)
+
+def get_analyses_for_job_description(db: Session, job_description_id: int, user_id: int, limit: int, cursor: int | None = None):
+    """One page of the user's analyses against one job description, newest first."""
+    query = db.query(models.AnalysisRecord).filter(
+        models.AnalysisRecord.owner_id == user_id,
+        models.AnalysisRecord.job_description_id == job_description_id
+    )
+    return _paginate(query, models.AnalysisRecord.id, limit, cursor, newest_first=True)
@@ -0,0 +1,35 @@
+import json
+from fastapi.responses import Response
+
+# orjson encodes JSON several times faster than the standard library.
+# It's optional: without it we fall back to the json module.
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps(data) -> bytes:
+    """Encodes plain Python data (dicts, lists, str, numbers, datetimes) as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def loads(data):
+    """Decodes JSON (bytes or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """
+    A JSON response for data we already trust (e.g. straight from our own
+    database): no Pydantic validation, just fast encoding.
+    Return it from an endpoint instead of the data to skip the response_model.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,223 @@
+import hashlib
+import html
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+import keyword_matcher
+import metrics
+import prompt_builder
+
+# --- Settings ---
+# How many prepared job descriptions we keep in memory
+JD_CACHE_MAX_ENTRIES = int(os.getenv("JD_CACHE_MAX_ENTRIES", 2000))
+# The most requirement lines we pull out of a posting
+MAX_REQUIREMENTS = 20
+# Part of every fingerprint. Bump it whenever the cleaning rules below change,
+# so job descriptions and cached analyses made with the old rules aren't reused
+JD_CLEANING_VERSION = 1
+
+# Tags that end a line when we strip HTML (so list items don't run together)
+_BLOCK_TAG_RE = re.compile(r"<\s*(br|/p|/div|/li|/h[1-6]|/tr|li)\b[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_INVISIBLE_RE = re.compile("[\\u200b\\u200c\\u200d\\u2060\\ufeff\\u00ad]")
+_BULLET_RE = re.compile(r"^[\s\-*•·▪◦‣–—>]+|^\d+[.)]\s+")
+
+# Lines that are in almost every posting but never matter for the match.
+# Statements (EEO, cookie banners) are dropped wherever they appear in a line...
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r"\ban equal opportunity( and affirmative action)? employer\b",
+        r"\bwe do not discriminate\b",
+        r"\bwithout regard to (race|religion|color)\b",
+        r"\b(need|request|require) (a )?reasonable accommodations?\b",
+        r"\bwe use cookies\b",
+        r"\b(accept|allow) (all )?cookies\b",
+    ]
+]
+# ...while page furniture ("Apply now", "Privacy policy") must be the whole line,
+# so requirements like "Apply today's best practices" or "privacy policy tooling" survive
+BOILERPLATE_LINES = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r"(click here to |click to )?(apply|applying)( now| today| here)?[.!]*",
+        r"click (here|apply)[.!]*",
+        r"share this job[.!]*",
+        r"(©|\(c\)|copyright)?.{0,60}\ball rights reserved[.!]*",
+        r"((read|see|view) our )?(privacy|cookie) (policy|notice|settings)[.!]*",
+        r"(about us|about the company)\s*:?",
+    ]
+]
+
+# Section headers that start the "what we need from you" part of a posting
+_REQUIREMENTS_HEADER_RE = re.compile(
+    r"^(requirements|qualifications|minimum qualifications|basic qualifications|"
+    r"what you('ll)? (need|bring)|what we('re)? looking for|who you are|you have|"
+    r"must[- ]haves?|skills( and experience)?|experience)"
+    # Just the header words, or a short header ending in ':'
+    r"(\s*:?$|[^.!?]{0,40}:$)",
+    re.IGNORECASE,
+)
+# Any other short line ending in ':' is the header of some other section
+_HEADER_RE = re.compile(r"^[^.!?]{2,60}:$")
+# Outside a requirements section, lines like these still read as requirements
+_REQUIREMENT_LINE_RE = re.compile(
+    r"\b(\d+\+? years|required|must|proficien|degree in|experience (with|in)|knowledge of)\b",
+    re.IGNORECASE,
+)
+
+# fingerprint -> prepared job description; plus raw text hash -> fingerprint,
+# so a posting we've seen before (byte for byte) skips even the cleaning
+_prepared = OrderedDict()
+_fingerprints_by_raw = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def clean_job_description(text: str):
+    """
+    Canonicalizes a posting: strips HTML and entities, odd Unicode, bullets,
+    boilerplate lines (EEO statements, "apply now"...) and repeated lines.
+    Line breaks are kept, since they carry the posting's structure.
+    """
+    text = _SCRIPT_RE.sub(" ", text or "")
+    text = _BLOCK_TAG_RE.sub("\n", text)
+    text = _TAG_RE.sub(" ", text)
+    text = html.unescape(text)
+    text = unicodedata.normalize("NFKC", text)
+    text = _INVISIBLE_RE.sub("", text)
+
+    seen = set()
+    lines = []
+    in_requirements = False
+    for line in text.splitlines():
+        line = " ".join(_BULLET_RE.sub("", line).split())
+        key = line.casefold()
+        if not line or key in seen:
+            continue
+        if _REQUIREMENTS_HEADER_RE.match(line):
+            in_requirements = True
+        elif _HEADER_RE.match(line):
+            in_requirements = False
+        # Nothing in the requirements section is ever thrown away
+        elif not in_requirements and _is_boilerplate(line):
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+def _is_boilerplate(line: str):
+    return (
+        any(pattern.fullmatch(line) for pattern in BOILERPLATE_LINES)
+        or any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS)
+    )
+
+def fingerprint(clean_text: str):
+    """
+    A stable id for a posting: the same job pasted as HTML, plain text or
+    with different spacing/case gets the same fingerprint. It starts with
+    the cleaning version, since other rules clean the same posting differently.
+    """
+    canonical = " ".join(clean_text.split()).casefold()
+    return f"v{JD_CLEANING_VERSION}:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def extract_requirements(clean_text: str):
+    """The lines of a posting that state what the candidate needs."""
+    requirements = []
+    in_requirements = False
+    for line in clean_text.splitlines():
+        if _REQUIREMENTS_HEADER_RE.match(line):
+            in_requirements = True
+            continue
+        if _HEADER_RE.match(line):
+            in_requirements = False
+            continue
+        if in_requirements or _REQUIREMENT_LINE_RE.search(line):
+            requirements.append(line)
+            if len(requirements) >= MAX_REQUIREMENTS:
+                break
+    return requirements
+
+def _prompt_section(clean_text: str, requirements: list[str]):
+    """
+    The job description as it goes in the prompt, within the token budget.
+    If the whole posting doesn't fit, the requirements go first so they
+    are what survives the cut.
+    """
+    max_chars = prompt_builder.PROMPT_JD_TOKEN_BUDGET * prompt_builder.CHARS_PER_TOKEN
+    if len(clean_text) <= max_chars or not requirements:
+        return prompt_builder.compact_job_description(clean_text)
+
+    wanted = set(requirements)
+    rest = [line for line in clean_text.splitlines() if line not in wanted]
+    reordered = "Requirements:\n" + "\n".join(requirements) + "\n\n" + "\n".join(rest)
+    return prompt_builder.compact_job_description(reordered)
+
+
+def _prepare_uncached(clean_text: str, jd_fingerprint: str):
+    requirements = extract_requirements(clean_text)
+    section, truncated = _prompt_section(clean_text, requirements)
+    return {
+        "fingerprint": jd_fingerprint,
+        "text": clean_text,
+        "requirements": requirements,
+        "terms": keyword_matcher.extract_job_terms(clean_text),
+        "prompt_section": section,
+        "prompt_truncated": truncated,
+    }
+
+def _remember(cache: OrderedDict, key, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > JD_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+def prepare(job_description: str):
+    """
+    Cleans a job description and derives everything the analysis needs from it
+    (fingerprint, requirements, weighted key terms and the compact prompt section).
+    The result is cached by fingerprint, so a posting shared by many users is
+    only processed once. Treat the returned dict as read-only: it is shared.
+    """
+    raw_key = hashlib.sha256((job_description or "").encode("utf-8")).digest()
+    with _lock:
+        jd_fingerprint = _fingerprints_by_raw.get(raw_key)
+        if jd_fingerprint is not None and jd_fingerprint in _prepared:
+            _prepared.move_to_end(jd_fingerprint)
+            _stats["hits"] += 1
+            return _prepared[jd_fingerprint]
+
+    with metrics.timer("jd_prepare"):
+        clean_text = clean_job_description(job_description)
+        jd_fingerprint = fingerprint(clean_text)
+        with _lock:
+            prepared = _prepared.get(jd_fingerprint)
+            if prepared is not None:
+                # A variant of a posting we already know (other HTML, spacing...)
+                _stats["hits"] += 1
+                _remember(_fingerprints_by_raw, raw_key, jd_fingerprint)
+                _prepared.move_to_end(jd_fingerprint)
+                return prepared
+
+        prepared = _prepare_uncached(clean_text, jd_fingerprint)
+        with _lock:
+            _stats["misses"] += 1
+            _remember(_prepared, jd_fingerprint, prepared)
+            _remember(_fingerprints_by_raw, raw_key, jd_fingerprint)
+        return prepared
+
+def clear():
+    with _lock:
+        _prepared.clear()
+        _fingerprints_by_raw.clear()
+
+def stats():
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / total, 3) if total else 0.0,
+            "size": len(_prepared),
+            "max_entries": JD_CACHE_MAX_ENTRIES,
+        }
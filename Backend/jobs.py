@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from collections import Counter
+import ai_analyzer
+import crud
+from database import SessionLocal
+
+# --- Settings ---
+# How many background analyses this process runs at the same time.
+# Set it to 0 on processes that should only accept jobs, not run them.
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", 4))
+# How often idle workers check the queue anyway (e.g. for jobs queued by another process)
+ANALYSIS_JOB_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", 2))
+# A running job's worker renews its lease every third of this; a job whose lease
+# ran out belongs to a dead process and is queued again. Every process can run
+# workers: live jobs of other processes are never taken from them.
+ANALYSIS_JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", 60))
+
+_workers = []
+_wakeup = None
+# user id -> how many of their jobs are running right now (used for fairness)
+_running_per_owner = Counter()
+# When this process last looked for jobs with an expired lease
+_last_requeue = 0.0
+
+
+def notify():
+    """Wakes idle workers up, e.g. right after a job was queued."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _run_job(db, job):
+    resume = crud.get_resume(db=db, resume_id=job.resume_id, user_id=job.owner_id)
+    if resume is None:
+        crud.finish_analysis_job(db, job, error="Resume not found")
+        return
+
+    try:
+        resume_data = ai_analyzer.build_resume_payload(resume)
+        result, model = await ai_analyzer.analyze_cached(db, resume.id, resume_data, job.job_description)
+    except Exception as e:
+        print(f"Error in background analysis {job.id}: {e}")
+        crud.finish_analysis_job(db, job, error=str(e))
+        return
+
+    crud.record_analysis(
+        db, resume_id=resume.id, user_id=job.owner_id, resume_data=resume_data,
+        job_description=job.job_description, result=result, model_name=model
+    )
+    crud.finish_analysis_job(db, job, result=result)
+
+def _fail_job(job_id: int, owner_id: int, error: str):
+    """Marks a job failed, in a fresh session (the job's own session may be broken)."""
+    with SessionLocal() as db:
+        job = crud.get_analysis_job(db, job_id=job_id, user_id=owner_id)
+        if job is not None and job.status == "running":
+            crud.finish_analysis_job(db, job, error=error)
+
+async def _keep_lease(job_id: int):
+    """Renews a running job's lease until it's cancelled (when the job ends)."""
+    while True:
+        await asyncio.sleep(ANALYSIS_JOB_LEASE_SECONDS / 3)
+        try:
+            with SessionLocal() as db:
+                crud.renew_analysis_job_lease(db, job_id)
+        except Exception as e:
+            # The next renewal may work; the lease only runs out after a few misses
+            print(f"Error renewing the lease of background analysis {job_id}: {e!r}")
+
+def _requeue_expired_jobs():
+    """Requeues jobs with an expired lease, at most twice per lease period."""
+    global _last_requeue
+    if time.monotonic() - _last_requeue < ANALYSIS_JOB_LEASE_SECONDS / 2:
+        return
+    _last_requeue = time.monotonic()
+    with SessionLocal() as db:
+        if crud.requeue_expired_analysis_jobs(db, ANALYSIS_JOB_LEASE_SECONDS):
+            notify()
+
+async def _work_once():
+    """Claims and runs one job. Returns False if the queue was empty."""
+    with SessionLocal() as db:
+        job = crud.claim_next_analysis_job(db, _running_per_owner)
+        if job is None:
+            return False
+
+        job_id, owner_id = job.id, job.owner_id
+        _running_per_owner[owner_id] += 1
+        lease = asyncio.create_task(_keep_lease(job_id))
+        try:
+            await _run_job(db, job)
+        except Exception as e:
+            # e.g. the database was locked while saving the result:
+            # the job fails, but the worker carries on with the next one
+            print(f"Error in background analysis {job_id}: {e!r}")
+            db.rollback()
+            _fail_job(job_id, owner_id, f"Internal error: {e}")
+        finally:
+            lease.cancel()
+            _running_per_owner[owner_id] -= 1
+    return True
+
+async def _worker_loop():
+    while True:
+        try:
+            if await _work_once():
+                continue
+            # Idle: pick up the jobs of workers that died
+            _requeue_expired_jobs()
+        except Exception as e:
+            # Claiming (or failing) a job went wrong; a worker must never die,
+            # so log it and try again after the poll interval
+            print(f"Error in background analysis worker: {e!r}")
+
+        # Nothing to do: sleep until a job is queued (or the poll interval passes)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=ANALYSIS_JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+async def start_workers():
+    """Starts the worker pool (called when the app starts)."""
+    global _wakeup
+    if _workers or ANALYSIS_JOB_WORKERS <= 0:
+        return
+
+    # Jobs that were running when a server stopped are run again once their
+    # lease runs out (the workers check for those whenever they're idle)
+    _wakeup = asyncio.Event()
+    for _ in range(ANALYSIS_JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker_loop()))
+
+async def stop_workers():
+    """Stops the worker pool (called when the app shuts down)."""
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,132 @@
+import math
+import re
+from collections import Counter
+
+# NumPy makes the scoring a couple of vector operations. It's optional:
+# without it we fall back to plain Python, which gives the same numbers.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Words that show up in almost every job description but say nothing about skills
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by
+can could did do does doing for from had has have having he her here his how i if in
+into is it its just may me more most must my no nor not of off on once only or other
+our out over own per same she should so some such than that the their them then there
+these they this those through to too under until up very via was we were what when
+where which while who whom why will with within without would you your yours
+ability able about across candidate candidates company day days description duties
+environment etc excellent experience experienced familiar familiarity good great help
+ideal including job join knowledge looking new nice plus preferred position required
+requirement requirements responsibilities responsible role skill skills strong team
+teams understanding using work working world year years yr yrs senior junior mid level
+expertise expert proven hands-on solid deep closely fast-paced opportunity opportunities
+""".split())
+
+# Tokens keep characters that matter in tech names: c++, c#, node.js, ci/cd
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+# ...but a term needs at least one letter ("5+", "24/7" and "2020" aren't skills)
+_LETTER_RE = re.compile(r"[a-z]")
+
+# How much a match in each part of the resume counts
+SOURCE_WEIGHTS = {"skills": 1.0, "experience": 0.8, "projects": 0.6}
+
+
+def tokenize(text: str):
+    """Lowercases a text and splits it into normalized tokens (stopwords removed)."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        token = token.rstrip("./-")
+        if len(token) > 1 and token not in STOPWORDS and _LETTER_RE.search(token):
+            tokens.append(token)
+    return tokens
+
+def _terms(tokens: list[str]):
+    """Single tokens plus adjacent pairs ("machine learning", "rest api")."""
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def extract_job_terms(job_description: str, max_terms: int = 40):
+    """
+    Picks the terms a job description cares about and weights them.
+    Single words are weighted by (log) frequency. A word pair only counts
+    if it repeats, since most adjacent pairs are just prose.
+    Returns a {term: weight} dict, heaviest first.
+    """
+    tokens = tokenize(job_description)
+    counts = Counter(tokens)
+    pair_counts = Counter(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    weights = {term: 1.0 + math.log(count) for term, count in counts.items()}
+    for pair, count in pair_counts.items():
+        if count > 1:
+            weights[pair] = 1.5 + math.log(count)
+
+    top = sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:max_terms]
+    return dict(top)
+
+
+def resume_terms(resume_data: dict):
+    """
+    Collects the terms a resume covers, per source.
+    'resume_data' is the payload from ai_analyzer.build_resume_payload.
+    """
+    skills = set()
+    for name in resume_data.get("skills", []):
+        skill_tokens = tokenize(name)
+        skills.update(_terms(skill_tokens))
+        if skill_tokens:
+            skills.add(" ".join(skill_tokens))
+
+    experience = set()
+    for exp in resume_data.get("experience", []):
+        experience.update(_terms(tokenize(f"{exp.get('role') or ''} {exp.get('responsibilities') or ''}")))
+
+    projects = set()
+    for proj in resume_data.get("projects", []):
+        projects.update(_terms(tokenize(f"{proj.get('name') or ''} {proj.get('description') or ''}")))
+
+    return {"skills": skills, "experience": experience, "projects": projects}
+
+
+def score_terms(job_terms: dict, covered: dict, max_missing: int = 10):
+    """
+    Scores how much of the job's (weighted) terms the resume covers.
+    A term counts with the best weight of the sources it appears in
+    (a listed skill counts more than a word in a project description).
+    Returns (score 0-100, missing terms heaviest first).
+    """
+    if not job_terms:
+        return 0.0, []
+
+    terms = list(job_terms)
+    if np is not None:
+        weights = np.fromiter(job_terms.values(), dtype=float, count=len(terms))
+        # One row per source: 1.0 where the source has the term
+        # (np.isin matches all the terms against a source at once, by sorting)
+        term_array = np.array(terms, dtype=str)
+        presence = np.stack([
+            np.isin(term_array, np.array(list(covered[source]), dtype=str)) for source in SOURCE_WEIGHTS
+        ]).astype(float)
+        source_weights = np.fromiter(SOURCE_WEIGHTS.values(), dtype=float)
+        coverage = (presence * source_weights[:, None]).max(axis=0)
+        score = float(coverage @ weights / weights.sum() * 100)
+        missing = [terms[i] for i in np.flatnonzero(coverage == 0)]
+    else:
+        coverage = [
+            max((weight for source, weight in SOURCE_WEIGHTS.items() if term in covered[source]), default=0.0)
+            for term in terms
+        ]
+        total = sum(job_terms.values())
+        score = sum(c * w for c, w in zip(coverage, job_terms.values())) / total * 100
+        missing = [term for term, c in zip(terms, coverage) if c == 0]
+
+    # Don't report a pair as missing if both its words are already missing
+    missing_words = {term for term in missing if " " not in term}
+    missing = [
+        term for term in missing
+        if " " not in term or not set(term.split()) <= missing_words
+    ]
+    return round(score, 1), missing[:max_missing]
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+import llm_providers
+import metrics
+
+# --- Retry settings ---
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))  # seconds
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 8))  # seconds
+
+# --- Circuit breaker settings ---
+# After this many failures in a row we stop calling the AI for a while...
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5))
+# ...and after this many seconds we let one call through to see if it's back
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
+# Error class names (from the Google SDK and Python) that are worth retrying.
+# Matching by name means we don't have to import the SDK here.
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable", "TooManyRequests", "ResourceExhausted", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted",
+}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the AI while the circuit breaker is open."""
+
+
+def is_retryable(error: Exception):
+    """True for errors that are probably temporary (timeouts, overload, 5xx)."""
+    if isinstance(error, (llm_providers.RetryableLLMError, TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service so requests fail fast during an outage.
+    closed    - normal, every call goes through
+    open      - too many failures, every call fails right away
+    half_open - the reset time passed, one trial call decides whether to close again
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, metrics: dict):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.metrics = metrics
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self.trial_running = False
+
+            if self.state == "open" or (self.state == "half_open" and self.trial_running):
+                self.metrics["short_circuited"] += 1
+                raise CircuitOpenError("The AI service is temporarily unavailable. Please try again shortly.")
+
+            if self.state == "half_open":
+                self.trial_running = True
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_running = False
+
+    def release_trial(self):
+        """
+        A call ended without telling us whether the service is healthy
+        (cancelled, client gone, or an error that isn't the service's fault).
+        If it was the half-open trial, the next call gets to be the trial instead.
+        """
+        with self.lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.metrics["circuit_opened"] += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+
+class ResilientLLMClient:
+    """
+    Wraps an LLMProvider with:
+    - retries with jittered exponential backoff for temporary errors
+    - a circuit breaker that fails fast while the provider is down
+    - single-flight: identical prompts in flight at the same time share one call
+    """
+
+    def __init__(
+        self,
+        provider: llm_providers.LLMProvider,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+    ):
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "coalesced": 0, "circuit_opened": 0, "short_circuited": 0,
+        }
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds, self.metrics)
+        self._in_flight = {}
+
+    def _backoff(self, attempt: int):
+        """'Full jitter': a random wait up to the exponential cap, so retries don't stampede."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _should_retry(self, error: Exception, attempt: int):
+        # Only errors that mean the service is struggling count towards opening
+        # the breaker; a bad prompt (a 400, a blocked response) is just that prompt's problem
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_trial()
+        if attempt >= self.max_retries or not is_retryable(error):
+            self.metrics["failures"] += 1
+            return False
+        self.metrics["retries"] += 1
+        return True
+
+    def generate(self, prompt: str) -> str:
+        """Blocking call with retries and the circuit breaker."""
+        self.metrics["calls"] += 1
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                with metrics.timer("ai_generate"):
+                    text = self.provider.generate(prompt)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Interrupted (KeyboardInterrupt...), so we learned nothing about the service
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            self.metrics["successes"] += 1
+            return text
+
+    async def _generate_with_retries(self, prompt: str) -> str:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                with metrics.timer("ai_generate"):
+                    text = await self.provider.generate_async(prompt)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, so we learned nothing about the service
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            self.metrics["successes"] += 1
+            return text
+
+    async def generate_async(self, prompt: str) -> str:
+        """Non-blocking call with retries, the circuit breaker and single-flight."""
+        self.metrics["calls"] += 1
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+        entry = self._in_flight.get(key)
+        if entry is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            entry = self._in_flight[key] = {
+                "task": asyncio.ensure_future(self._generate_with_retries(prompt)),
+                "waiters": 0,
+            }
+            entry["task"].add_done_callback(lambda _: self._forget_in_flight(key, entry))
+
+        # shield() so one caller giving up doesn't cancel the call for everyone else...
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            # ...but once nobody is waiting for it (timeouts, clients gone), stop the call
+            if entry["waiters"] == 0 and not entry["task"].done():
+                self._forget_in_flight(key, entry)
+                entry["task"].cancel()
+
+    def _forget_in_flight(self, key: str, entry: dict):
+        if self._in_flight.get(key) is entry:
+            del self._in_flight[key]
+
+    async def stream_async(self, prompt: str):
+        """
+        Streams through the circuit breaker. There are no retries here:
+        once pieces have been sent to the client we can't take them back.
+        """
+        self.metrics["calls"] += 1
+        self.breaker.before_call()
+        try:
+            with metrics.timer("ai_stream"):
+                async for piece in self.provider.stream_async(prompt):
+                    yield piece
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_trial()
+            self.metrics["failures"] += 1
+            raise
+        except BaseException:
+            # The client went away (GeneratorExit) or the caller timed out (CancelledError)
+            # in the middle of the stream; that says nothing about the service
+            self.breaker.release_trial()
+            raise
+        self.breaker.record_success()
+        self.metrics["successes"] += 1
+
+    def stats(self):
+        return {**self.metrics, "circuit_state": self.breaker.state, "in_flight": len(self._in_flight)}
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+# This is the JSON structure we want the AI to return
+# We will define this in schemas.py as well
+AI_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {
+            "type": "NUMBER",
+            "description": "A score from 0-100 of how well the resume matches the job description."
+        },
+        "missing_keywords": {
+            "type": "ARRAY",
+            "items": {"type": "STRING"},
+            "description": "A list of 5-10 key skills or terms from the job description that are missing from the resume."
+        },
+        "suggestions": {
+            "type": "STRING",
+            "description": "A 3-5 bullet point list (as a single string) of specific, actionable advice to improve the resume for this job."
+        }
+    },
+    "required": ["score", "missing_keywords", "suggestions"]
+}
+
+
+class RetryableLLMError(Exception):
+    """A temporary provider error (overloaded, rate limited...) that is worth retrying."""
+
+
+class LLMProvider:
+    """
+    The interface every AI backend implements.
+    Each method takes the full prompt and returns the model's raw JSON text.
+    """
+    # Part of the analysis cache key, so switching models never serves a stale analysis
+    model_name = "unknown"
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def stream_async(self, prompt: str):
+        """Yields the answer in pieces as they are produced."""
+        # Providers that can't stream just send everything at once
+        yield await self.generate_async(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini, through the google-generativeai SDK."""
+
+    def __init__(self, model_name: str, api_key: str | None = None):
+        # The SDK is slow to import, so we only load it when we really need it
+        import google.generativeai as genai
+
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found. Make sure it's set in your .env file.")
+
+        # Configure the Gemini client
+        genai.configure(api_key=api_key)
+
+        # Set up the model
+        generation_config = genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=AI_RESPONSE_SCHEMA
+        )
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name, generation_config=generation_config)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def generate_async(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream_async(self, prompt: str):
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+
+class FakeProvider(LLMProvider):
+    """
+    A local stand-in for the AI, for offline development, tests and benchmarks.
+    It answers instantly (or after 'latency_seconds') with a made-up but
+    deterministic analysis: the same prompt always gets the same answer.
+    """
+    model_name = "fake"
+
+    def __init__(self, latency_seconds: float = 0.0, fail_first: int = 0):
+        self.latency_seconds = latency_seconds
+        # Fail this many calls first (with a retryable error), to test retries and the breaker
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def _answer(self, prompt: str):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise RetryableLLMError(f"Fake provider failure {self.calls} of {self.fail_first}")
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return json.dumps({
+            "score": float(digest[0] % 101),
+            "missing_keywords": ["communication", "leadership", "testing"][: 1 + digest[1] % 3],
+            "suggestions": "- This analysis was made by the local fake AI provider.\n"
+                           "- Set LLM_PROVIDER=gemini to get a real analysis.",
+        })
+
+    def generate(self, prompt: str) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._answer(prompt)
+
+    async def generate_async(self, prompt: str) -> str:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._answer(prompt)
+
+    async def stream_async(self, prompt: str):
+        text = await self.generate_async(prompt)
+        for start in range(0, len(text), 16):
+            yield text[start:start + 16]
@@ -1,3 +1,6 @@
+from dotenv import load_dotenv
+load_dotenv() # Load the .env file first, so every module sees its settings
+
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -9,19 +12,54 @@ import security # This should already be there
 import crud # This should already be there
 from typing import List
 import ai_analyzer # Our new file
-from typing import List # This might already be here
-from fastapi import FastAPI, Depends, HTTPException, Response, status
+import analysis_cache
+import jd_preprocessor
+import user_cache
+import search_index
+import jobs
+import metrics
+import rate_limit
+from fast_json import FastJSONResponse
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional, Literal # This might already be here
+from fastapi import FastAPI, Depends, HTTPException, Response, status, Request, Query
+import asyncio
+import hashlib
+import math
+import json
+from fastapi.responses import StreamingResponse, PlainTextResponse
 
 # Import all our new files
 import models
 import schemas
 import crud
-from database import engine, get_db  # get_db was in database.py
+from database import engine, get_db, SessionLocal, add_missing_columns  # get_db was in database.py
 
 # This creates the tables (it's safe to run every time)
 models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+# ...and this adds any new columns to tables that already existed
+add_missing_columns()
+with SessionLocal() as startup_db:
+    crud.backfill_section_counts(startup_db)
+    search_index.backfill(startup_db)
+
+# Page size limits for the list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# How many resumes one bulk import request may create
+MAX_BULK_IMPORT = 200
+# How many analyses one batch request may contain, and how many of them run at once
+MAX_BATCH_ANALYSES = 50
+BATCH_ANALYSIS_CONCURRENCY = 8
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the background analysis workers, and stop them on shutdown
+    await jobs.start_workers()
+    yield
+    await jobs.stop_workers()
+
+app = FastAPI(lifespan=lifespan)
 
 # This tells FastAPI to look for a token in the URL "/token"
 # (but we won't use it directly, it just sets up the dependency)
@@ -43,6 +81,193 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Instrumentation ---
+# Request timings, SQL counts and slow-operation timers (see metrics.py).
+# Added last so it's the outermost middleware and times everything else too.
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# --- Helpers ---
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    Runs a coroutine, but cancels it if the client goes away first.
+    This way a closed browser tab doesn't keep an AI call running.
+    """
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=0.5)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+
+async def analyze_with_cache(db: Session, resume_id: int, user_id: int, resume_data: dict, job_description: str):
+    """
+    Analyzes a resume payload against a job description (using the cache)
+    and adds it to the user's analysis history.
+    Returns the fallback error analysis if the AI call fails.
+    """
+    try:
+        result, model = await ai_analyzer.analyze_cached(db, resume_id, resume_data, job_description)
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        # Failed analyses are never cached (or kept in the history)
+        return ai_analyzer.error_result(e)
+
+    crud.record_analysis(
+        db, resume_id=resume_id, user_id=user_id, resume_data=resume_data,
+        job_description=job_description, result=result, model_name=model
+    )
+    return result
+
+# Bump this when the JSON a resume is returned as changes shape,
+# so clients don't keep using copies cached under the old format
+RESUME_REPRESENTATION_VERSION = 1
+
+def resume_etag(versions, *extra):
+    """
+    A strong ETag for one or more resumes, made only from their id, revision
+    and updated-at (so it can be checked without loading the sections).
+    'extra' is anything else that changes the response, like the next cursor.
+    """
+    parts = [str(RESUME_REPRESENTATION_VERSION)]
+    for version in versions:
+        updated_at = version.updated_at.isoformat() if version.updated_at else ""
+        parts.append(f"{version.id}:{version.revision or 0}:{updated_at}")
+    parts.extend(str(value) for value in extra)
+    return '"' + hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(request: Request, etag: str):
+    """True if the client's If-None-Match already has this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified(etag: str, headers: dict | None = None):
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "private, no-cache", **(headers or {})}
+    )
+
+def sse_event(event: str, data: dict):
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def check_batch_size(size: int):
+    if size == 0:
+        raise HTTPException(status_code=422, detail="A batch needs at least one item")
+    if size > MAX_BATCH_ANALYSES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"You can analyze at most {MAX_BATCH_ANALYSES} items per batch"
+        )
+
+# --- Rate limiting ---
+# Token buckets per user/IP and a cap on each user's running analyses (see rate_limit.py),
+# so one script can't use up the AI quota, bcrypt and DB time everyone else needs.
+
+def client_ip(request: Request):
+    return rate_limit.client_ip(request.client.host if request.client else None, request.headers.get("x-forwarded-for"))
+
+def too_many_requests(retry_after: float, detail: str):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+def enforce_rate_limit(name: str, identity, cost: int = 1):
+    retry_after = rate_limit.hit(name, identity, cost)
+    if retry_after:
+        raise too_many_requests(retry_after, "Too many requests, please slow down")
+
+def limit_per_ip(name: str):
+    """A dependency that applies the 'name' limit to the client's IP address."""
+    async def check(request: Request):
+        enforce_rate_limit(name, client_ip(request))
+    return check
+
+def enforce_analysis_rate(request: Request, user_id: int, cost: int = 1):
+    """Charges 'cost' AI analyses to both the user and their IP address."""
+    enforce_rate_limit("analyze_user", user_id, cost)
+    enforce_rate_limit("analyze_ip", client_ip(request), cost)
+
+def acquire_analysis_slots(user_id: int, wanted: int = 1):
+    """
+    Takes up to 'wanted' of the user's free analysis slots (at least one,
+    or it's a 429). Whoever holds them may run that many analyses at once.
+    """
+    slots = rate_limit.acquire_analysis_slots(user_id, wanted)
+    if not slots:
+        raise too_many_requests(
+            rate_limit.ANALYSIS_SLOT_RETRY_AFTER,
+            f"You can run at most {rate_limit.MAX_CONCURRENT_ANALYSES} analyses at the same time"
+        )
+    return slots
+
+@contextmanager
+def analysis_slot(user_id: int):
+    """Holds one of the user's analysis slots while the block runs."""
+    slots = acquire_analysis_slots(user_id)
+    try:
+        yield
+    finally:
+        rate_limit.release_analysis_slot(slots[0])
+
+async def holding_analysis_slots(stream, slots: list):
+    """Passes a streamed response through, and gives the slots back when it ends (or the client leaves)."""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        for slot in slots:
+            rate_limit.release_analysis_slot(slot)
+
+async def stream_batch_analyses(jobs: list, user_id: int, concurrency: int = BATCH_ANALYSIS_CONCURRENCY):
+    """
+    Runs many of a user's analyses and yields one JSON line per job as each finishes.
+    'jobs' is a list of (resume_id, resume_data, job_description).
+
+    Identical jobs (same resume + same JD fingerprint) are only analyzed once,
+    and at most 'concurrency' run at the same time.
+    """
+    # 1. Group identical jobs together, remembering their positions
+    unique_jobs = {}
+    for index, (resume_id, resume_data, text) in enumerate(jobs):
+        key = (resume_id, analysis_cache.hash_job_description(text))
+        unique_jobs.setdefault(key, (resume_id, resume_data, text, []))[3].append(index)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_one(resume_id, resume_data, text, indexes):
+        async with slots:
+            # The request's DB session may be closed while we stream, so use our own
+            with SessionLocal() as db:
+                result = await analyze_with_cache(db, resume_id, user_id, resume_data, text)
+        return resume_id, indexes, result
+
+    # 2. Start them all, and send each result as soon as it's done
+    tasks = [asyncio.ensure_future(run_one(*job)) for job in unique_jobs.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            resume_id, indexes, result = await next_done
+            for index in indexes:
+                line = {"index": index, "resume_id": resume_id, "result": result}
+                yield json.dumps(line) + "\n"
+    finally:
+        # If the client went away, don't leave analyses running
+        for task in tasks:
+            task.cancel()
+
+
 # --- API Endpoints ---
 
 @app.get("/")
@@ -50,8 +275,8 @@ def read_root():
     return {"message": "GROBS.AI Backend is running!"}
 
 
-@app.post("/register/", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+@app.post("/register/", response_model=schemas.User, dependencies=[Depends(limit_per_ip("register_ip"))])
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
     # 1. Check if user already exists
     db_user = crud.get_user_by_email(db, email=user.email)
@@ -59,21 +284,31 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         # If they do, raise an error
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # 2. If not, create the new user
-    return crud.create_user(db=db, user=user)
+    # 2. If not, hash the password (in the hashing pool) and create the new user
+    hashed_password = await security.get_password_hash_async(user.password)
+    return crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 
-@app.post("/token", response_model=schemas.Token)
+@app.post("/token", response_model=schemas.Token, dependencies=[Depends(limit_per_ip("login_ip"))])
 async def login_for_access_token(
     db: Session = Depends(get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
 
     # 1. Get the user from the DB by email (form_data.username is the email)
+    # (each email only gets a few tries a minute, from any IP, to slow down password guessing)
+    enforce_rate_limit("login_account", form_data.username.strip().lower())
     user = crud.get_user_by_email(db, email=form_data.username)
 
     # 2. Check if user exists and if the password is correct
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    # (bcrypt runs in the hashing pool, so other requests keep being served)
+    password_ok, new_hash = False, None
+    if user:
+        password_ok, new_hash = await security.verify_and_update_password_async(
+            form_data.password, user.hashed_password
+        )
+
+    if not password_ok:
         # If not, raise an error
         raise HTTPException(
             status_code=401,
@@ -81,9 +316,14 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # If the hash was made with old settings, save the upgraded one
+    if new_hash:
+        crud.update_user_password_hash(db, user, new_hash)
+
     # 3. If password is correct, create a new access token
+    # (uid and is_active let get_current_user skip the DB when that's enabled)
     access_token = security.create_access_token(
-        data={"sub": user.email}
+        data={"sub": user.email, "uid": user.id, "is_active": user.is_active}
     )
 
     # 4. Return the token
@@ -95,7 +335,9 @@ async def get_current_user(
 ):
     """
     A dependency that gets the token, decodes it,
-    and returns the user from the database.
+    and returns the logged-in user.
+    To avoid a database query on every request, the user comes from
+    (in order): the token itself (if trusted), the user cache, or the database.
     """
     
     # 1. Decode the token to get the email
@@ -109,7 +351,16 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    # 2. Get the user from the database
+    # 2. Stateless fast path: the signed token already tells us who this is
+    if security.TRUST_TOKEN_CLAIMS and token_data.uid is not None and token_data.is_active is not None:
+        return schemas.User(id=token_data.uid, email=token_data.email, is_active=token_data.is_active)
+
+    # 3. Recently seen users come from the cache
+    cached_user = user_cache.get(token_data.email)
+    if cached_user is not None:
+        return cached_user
+
+    # 4. Otherwise get the user from the database
     user = crud.get_user_by_email(db, email=token_data.email)
     
     if user is None:
@@ -120,12 +371,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    return user # This is the logged-in user object
+    return user_cache.put(user) # This is the logged-in user
 
 
 @app.get("/users/me", response_model=schemas.User)
 async def read_users_me(
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     A protected endpoint. If you can access this,
@@ -138,7 +389,7 @@ async def read_users_me(
 async def create_new_resume(
     resume_data: schemas.ResumeCreate, 
     db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Protected endpoint to create a new resume.
@@ -152,40 +403,128 @@ async def create_new_resume(
     # 3. Call the CRUD function to save everything
     return crud.create_resume(db=db, resume_data=resume_data, user_id=current_user.id)
 
+@app.post("/resumes/bulk", response_model=schemas.ResumeBulkCreateResult)
+async def bulk_create_resumes(
+    bulk_data: schemas.ResumeBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to import many resumes at once.
+    They are all created in one transaction: either all of them are saved, or none.
+    """
+    if len(bulk_data.resumes) > MAX_BULK_IMPORT:
+        raise HTTPException(
+            status_code=413,
+            detail=f"You can import at most {MAX_BULK_IMPORT} resumes per request"
+        )
+
+    new_ids = crud.create_resumes_bulk(
+        db=db, resumes_data=bulk_data.resumes, user_id=current_user.id
+    )
+    return {"created": len(new_ids), "ids": new_ids}
+
+@app.post("/resumes/search", response_model=List[schemas.ResumeSearchHit])
+async def search_user_resumes(
+    search: schemas.ResumeSearchIn,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to find which of the user's resumes best fit a job description.
+    It uses the keyword index, so it's instant and never calls the AI.
+    """
+    hits = search_index.search(db, owner_id=current_user.id, query=search.text, limit=limit)
+
+    # Add the resume names (one small column-only query)
+    names = crud.get_resume_names(db, resume_ids=[hit["resume_id"] for hit in hits])
+    for hit in hits:
+        hit["full_name"] = names.get(hit["resume_id"])
+    return hits
+
 @app.get("/resumes/", response_model=List[schemas.Resume])
 async def read_user_resumes(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to get the resumes for the current user, one page at a time.
+    If there are more, the 'X-Next-Cursor' header holds the value
+    to pass as ?cursor= for the next page.
+    Send the page's ETag back in If-None-Match to get a 304 if nothing changed.
+    """
+    # 1. Read the page's resume rows (no sections yet): enough for the ETag
+    rows, next_cursor = crud.get_resume_rows_page(
+        db=db, user_id=current_user.id, limit=limit, cursor=cursor
+    )
+    etag = resume_etag(rows, limit, cursor, next_cursor)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag, headers)
+
+    # 2. Something changed (or the client has no copy yet): add the sections.
+    # This is our own database's data, so it's sent without re-validating it.
+    return FastJSONResponse(crud.resume_dicts(db, rows), headers=headers)
+
+
+@app.get("/resumes/summary", response_model=schemas.ResumeSummaryPage)
+async def read_user_resume_summaries(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
-    Protected endpoint to get all resumes for the current user.
+    Protected endpoint to get a lightweight list of the current user's resumes
+    (name, template, section counts and last update), one page at a time.
     """
-    return crud.get_resumes_by_owner(db=db, user_id=current_user.id)
+    items, next_cursor = crud.get_resume_summaries(
+        db=db, user_id=current_user.id, limit=limit, cursor=cursor
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @app.get("/resume/{resume_id}", response_model=schemas.Resume)
 async def read_resume(
     resume_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Protected endpoint to get a single resume by its ID.
+    Send its ETag back in If-None-Match to get a 304 if it hasn't changed.
     """
-    db_resume = crud.get_resume(db=db, resume_id=resume_id, user_id=current_user.id)
-    if db_resume is None:
+    # 1. Just the resume's own row first: enough for the ETag
+    row = crud.get_resume_row(db=db, resume_id=resume_id, user_id=current_user.id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Resume not found")
-    return db_resume
+    etag = resume_etag([row])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # 2. Add the sections and send it
+    resume = crud.resume_dicts(db, [row])[0]
+    return FastJSONResponse(resume, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
 
 @app.post("/resume/{resume_id}/analyze", response_model=schemas.AnalysisResult)
 async def analyze_resume(
     resume_id: int,
     job_description: schemas.JobDescriptionIn,
+    request: Request,
+    mode: Literal["full", "fast"] = "full",
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Protected endpoint to analyze a specific resume against a job description.
+    With ?mode=fast you get an instant keyword-based score instead of the AI analysis.
     """
 
     # 1. Get the resume from the DB
@@ -193,21 +532,346 @@ async def analyze_resume(
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
 
-    # 2. Call our new AI analyzer function
-    # This function does the heavy lifting
-    analysis_data = ai_analyzer.analyze_resume_with_ai(
-        resume=resume,
-        job_description=job_description.text
+    # 2. Fast mode: score it locally, no AI call
+    resume_data = ai_analyzer.build_resume_payload(resume)
+    if mode == "fast":
+        return ai_analyzer.prescore_resume(resume_data, job_description.text)
+
+    # 3. Analyze it (or reuse a cached analysis), without blocking the event loop
+    enforce_analysis_rate(request, current_user.id)
+    with analysis_slot(current_user.id):
+        return await run_until_disconnect(
+            request,
+            analyze_with_cache(db, resume.id, current_user.id, resume_data, job_description.text)
+        )
+
+
+@app.post("/resume/{resume_id}/analyze/stream")
+async def analyze_resume_stream(
+    resume_id: int,
+    job_description: schemas.JobDescriptionIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to analyze a resume, streaming the result as Server-Sent Events.
+    Events arrive in this order: 'score', 'missing_keywords', one or more
+    'suggestions' (each with a 'delta' of new text), then 'done' with the
+    full analysis. If something goes wrong an 'error' event is sent instead.
+    """
+    resume = crud.get_resume(db=db, resume_id=resume_id, user_id=current_user.id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    resume_data = ai_analyzer.build_resume_payload(resume)
+    cache_key = analysis_cache.make_key(resume_data, job_description.text, ai_analyzer.model_name())
+    cached = analysis_cache.get(db, cache_key)
+    slots = None
+    if cached is not None:
+        # Like /analyze, a cache hit still goes in the user's history
+        crud.record_analysis(
+            db, resume_id=resume.id, user_id=current_user.id, resume_data=resume_data,
+            job_description=job_description.text, result=cached, model_name=ai_analyzer.model_name()
+        )
+    else:
+        # Only a real AI call counts against the limits
+        enforce_analysis_rate(request, current_user.id)
+        slots = acquire_analysis_slots(current_user.id)
+
+    async def event_stream():
+        # A cached analysis is sent right away, in the same event format
+        if cached is not None:
+            yield sse_event("score", {"score": cached["score"]})
+            yield sse_event("missing_keywords", {"missing_keywords": cached["missing_keywords"]})
+            yield sse_event("suggestions", {"delta": cached["suggestions"]})
+            yield sse_event("done", cached)
+            return
+
+        try:
+            async for event, data in ai_analyzer.stream_analysis(resume_data, job_description.text):
+                if event == "done":
+                    # The request's DB session may be closed while we stream, so use our own
+                    with SessionLocal() as cache_db:
+                        analysis_cache.put(cache_db, cache_key, resume_id=resume_id, result=data)
+                        crud.record_analysis(
+                            cache_db, resume_id=resume_id, user_id=current_user.id,
+                            resume_data=resume_data, job_description=job_description.text,
+                            result=data, model_name=ai_analyzer.model_name()
+                        )
+                yield sse_event(event, data)
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}")
+            yield sse_event("error", ai_analyzer.error_result(e))
+
+    return StreamingResponse(
+        event_stream() if slots is None else holding_analysis_slots(event_stream(), slots),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/resume/{resume_id}/analyze/batch")
+async def analyze_resume_batch(
+    resume_id: int,
+    batch: schemas.BatchJobDescriptionsIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to analyze one resume against many job descriptions.
+    Results are streamed back as JSON lines, each one as soon as it's ready.
+    """
+    check_batch_size(len(batch.job_descriptions))
+
+    resume = crud.get_resume(db=db, resume_id=resume_id, user_id=current_user.id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    # The resume payload is built once and shared by every analysis
+    resume_data = ai_analyzer.build_resume_payload(resume)
+    jobs = [(resume.id, resume_data, text) for text in batch.job_descriptions]
+    # A batch costs one request per analysis, and runs as many at once as it got analysis slots
+    enforce_analysis_rate(request, current_user.id, cost=len(jobs))
+    slots = acquire_analysis_slots(current_user.id, min(BATCH_ANALYSIS_CONCURRENCY, len(jobs)))
+    return StreamingResponse(
+        holding_analysis_slots(stream_batch_analyses(jobs, current_user.id, concurrency=len(slots)), slots),
+        media_type="application/x-ndjson"
     )
 
-    # 3. Return the JSON analysis
-    return analysis_data  
+
+@app.post("/resumes/analyze/batch")
+async def analyze_resumes_batch(
+    batch: schemas.BatchResumesIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to analyze many of the user's resumes against one job description.
+    Results are streamed back as JSON lines, each one as soon as it's ready.
+    """
+    check_batch_size(len(batch.resume_ids))
+
+    resumes = crud.get_resumes_by_ids(db=db, resume_ids=batch.resume_ids, user_id=current_user.id)
+    missing = set(batch.resume_ids) - {resume.id for resume in resumes}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Resumes not found: {sorted(missing)}")
+
+    payloads = {resume.id: ai_analyzer.build_resume_payload(resume) for resume in resumes}
+    jobs = [(resume_id, payloads[resume_id], batch.job_description) for resume_id in batch.resume_ids]
+    enforce_analysis_rate(request, current_user.id, cost=len(jobs))
+    slots = acquire_analysis_slots(current_user.id, min(BATCH_ANALYSIS_CONCURRENCY, len(jobs)))
+    return StreamingResponse(
+        holding_analysis_slots(stream_batch_analyses(jobs, current_user.id, concurrency=len(slots)), slots),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/resume/{resume_id}/analyses/latest", response_model=schemas.AnalysisRecord)
+async def read_latest_analysis(
+    resume_id: int,
+    job_description: schemas.JobDescriptionIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to get the latest analysis of a resume against a job description.
+    If the resume hasn't changed since that analysis it is returned as is;
+    otherwise (or if there is none yet) the resume is analyzed again.
+    """
+    resume = crud.get_resume(db=db, resume_id=resume_id, user_id=current_user.id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    # 1. Is the stored analysis still current?
+    resume_data = ai_analyzer.build_resume_payload(resume)
+    db_jd = crud.get_job_description_by_text(db, job_description.text)
+    if db_jd is not None:
+        latest = crud.get_latest_analysis(
+            db, resume_id=resume.id, user_id=current_user.id, job_description_id=db_jd.id
+        )
+        if (
+            latest is not None
+            and latest.resume_hash == analysis_cache.hash_resume_payload(resume_data)
+            and latest.model_name == ai_analyzer.model_name()
+        ):
+            return latest
+
+    # 2. No: analyze it now
+    enforce_analysis_rate(request, current_user.id)
+    try:
+        with analysis_slot(current_user.id):
+            result, model = await run_until_disconnect(
+                request,
+                ai_analyzer.analyze_cached(db, resume.id, resume_data, job_description.text)
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        raise HTTPException(status_code=502, detail=ai_analyzer.error_result(e)["suggestions"])
+
+    return crud.record_analysis(
+        db, resume_id=resume.id, user_id=current_user.id, resume_data=resume_data,
+        job_description=job_description.text, result=result, model_name=model
+    )
+
+
+@app.get("/resume/{resume_id}/analyses", response_model=List[schemas.AnalysisRecord])
+async def read_resume_analyses(
+    resume_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to list a resume's analysis history, newest first.
+    If there are more, the 'X-Next-Cursor' header holds the value
+    to pass as ?cursor= for the next page.
+    """
+    analyses, next_cursor = crud.get_analyses_for_resume(
+        db, resume_id=resume_id, user_id=current_user.id, limit=limit, cursor=cursor
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return analyses
+
+
+@app.get("/job-descriptions/{job_description_id}/analyses", response_model=List[schemas.AnalysisRecord])
+async def read_job_description_analyses(
+    job_description_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to list every analysis of the user's resumes against one job description.
+    """
+    analyses, next_cursor = crud.get_analyses_for_job_description(
+        db, job_description_id=job_description_id, user_id=current_user.id, limit=limit, cursor=cursor
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return analyses
+
+
+@app.post("/resume/{resume_id}/analyze/jobs", response_model=schemas.AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(
+    resume_id: int,
+    job_description: schemas.JobDescriptionIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to analyze a resume in the background.
+    It returns a job right away; poll GET /analysis-jobs/{job_id} for the result.
+    """
+    resume = crud.get_resume(db=db, resume_id=resume_id, user_id=current_user.id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    # Queued jobs count against the request limits; how many run at once
+    # is already up to the workers, which take turns between users
+    enforce_analysis_rate(request, current_user.id)
+    db_job = crud.create_analysis_job(
+        db=db, resume_id=resume.id, user_id=current_user.id, job_description=job_description.text
+    )
+    jobs.notify()
+    return db_job
+
+
+@app.get("/analysis-jobs/{job_id}", response_model=schemas.AnalysisJob)
+async def read_analysis_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to check on a background analysis (and get its result when done).
+    """
+    db_job = crud.get_analysis_job(db=db, job_id=job_id, user_id=current_user.id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return db_job
+
+
+@app.get("/resume/{resume_id}/analysis-jobs", response_model=List[schemas.AnalysisJob])
+async def read_resume_analysis_jobs(
+    resume_id: int,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to list the background analyses of a resume, newest first.
+    """
+    return crud.get_analysis_jobs_for_resume(
+        db=db, resume_id=resume_id, user_id=current_user.id, limit=limit
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Request latency, SQL counts and slow-operation timings in the Prometheus text format.
+    Point your Prometheus scraper here (it's not behind login, so keep it off the public internet).
+    """
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/analysis-cache/stats", response_model=schemas.AnalysisCacheStats)
+async def read_analysis_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint that reports the analysis cache hit/miss counters.
+    """
+    return analysis_cache.stats(db)
+
+@app.get("/job-descriptions/cache/stats", response_model=schemas.JobDescriptionCacheStats)
+async def read_job_description_cache_stats(
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint that reports how often a job description was already prepared.
+    """
+    return jd_preprocessor.stats()
+
+@app.get("/ai/stats", response_model=schemas.LLMClientStats)
+async def read_ai_client_stats(
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint that reports the AI client's retry, circuit breaker
+    and request coalescing counters.
+    """
+    return ai_analyzer.get_client().stats()
+
+@app.get("/rate-limits/stats", response_model=schemas.RateLimitStats)
+async def read_rate_limit_stats(
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint that reports the rate limits and how many requests each one turned away.
+    """
+    return rate_limit.stats()
 
 @app.delete("/resume/{resume_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_resume(
     resume_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Protected endpoint to delete a resume.
@@ -227,7 +891,7 @@ async def update_resume(
     resume_id: int,
     resume_data: schemas.ResumeCreate, # We can re-use the Create schema!
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Protected endpoint to update an existing resume.
@@ -243,4 +907,29 @@ async def update_resume(
     if db_resume is None:
         raise HTTPException(status_code=404, detail="Resume not found")
         
-    return db_resume
\ No newline at end of file
+    return db_resume
+
+
+@app.patch("/resume/{resume_id}", response_model=schemas.Resume)
+async def patch_resume(
+    resume_id: int,
+    patch_data: schemas.ResumePatch,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Protected endpoint to partially update a resume.
+    Only the fields and sections in the request body are changed.
+    """
+
+    db_resume = crud.patch_resume(
+        db=db,
+        resume_id=resume_id,
+        user_id=current_user.id,
+        patch_data=patch_data
+    )
+
+    if db_resume is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    return db_resume
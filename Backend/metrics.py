@@ -0,0 +1,269 @@
+import contextvars
+import os
+import threading
+import time
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# --- Settings ---
+# METRICS_ENABLED=0 turns all of this off: no middleware, no SQL hooks,
+# and every timer becomes a shared do-nothing object.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Add a Server-Timing header to every response (shows up in the browser's dev tools)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+
+# Histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Histogram buckets for prompt sizes, in (estimated) tokens
+TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+
+# What each metric means (the HELP lines on /metrics)
+DESCRIPTIONS = {
+    "grobs_http_request_duration_seconds": "Time to handle an HTTP request, by route.",
+    "grobs_http_request_db_queries_total": "SQL statements run while handling requests, by route.",
+    "grobs_http_request_db_seconds_total": "Time spent in SQL while handling requests, by route.",
+    "grobs_db_query_duration_seconds": "Time each SQL statement took.",
+    "grobs_operation_duration_seconds": "Time spent in slow operations (AI calls, password hashing...).",
+    "grobs_rate_limit_rejections_total": "Requests turned away with 429, by limit.",
+    "grobs_prompt_estimated_tokens": "Estimated size of each analysis prompt sent to the AI, in tokens.",
+    "grobs_prompts_truncated_total": "Analysis prompts whose job description was cut to fit the token budget.",
+}
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for index, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.bucket_counts[index] += 1
+                break
+
+
+# --- Storage ---
+# (metric name, sorted label pairs) -> _Histogram or a number
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+def observe(name: str, labels: dict, value: float, buckets: tuple = LATENCY_BUCKETS):
+    """Records one value (a timing, unless other buckets are given) in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+def inc(name: str, labels: dict, amount: float = 1):
+    """Adds to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def reset():
+    """Forgets everything recorded so far (for benchmarks)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# --- Per-request timings ---
+# The middleware puts one of these in a context variable, so code deep
+# inside a request (SQL hooks, timers) can add to it without passing it around.
+
+class RequestTimings:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.operations = {}  # operation name -> seconds
+        self.prompt_tokens = 0  # estimated tokens of the AI prompts built for this request
+
+    def server_timing(self, total_seconds: float):
+        """Formats the Server-Timing header value (durations are in milliseconds)."""
+        parts = [f"db;desc=\"{self.db_queries} queries\";dur={self.db_seconds * 1000:.1f}"]
+        for name, seconds in self.operations.items():
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        if self.prompt_tokens:
+            parts.append(f"prompt;desc=\"{self.prompt_tokens} tokens\"")
+        parts.append(f"app;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+# --- Timers ---
+
+class _Timer:
+    def __init__(self, operation: str):
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        observe("grobs_operation_duration_seconds", {"operation": self.operation}, elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.operations[self.operation] = timings.operations.get(self.operation, 0.0) + elapsed
+        return False
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_TIMER = _NoTimer()
+
+def timer(operation: str):
+    """
+    Times a block of code (sync or async):
+        with metrics.timer("password_hash"):
+            ...
+    """
+    return _Timer(operation) if METRICS_ENABLED else _NO_TIMER
+
+
+def record_prompt(estimated_tokens: int, truncated: bool):
+    """Records the estimated size of an AI prompt (and adds it to the request's Server-Timing)."""
+    if not METRICS_ENABLED:
+        return
+    observe("grobs_prompt_estimated_tokens", {}, estimated_tokens, buckets=TOKEN_BUCKETS)
+    if truncated:
+        inc("grobs_prompts_truncated_total", {})
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.prompt_tokens += estimated_tokens
+
+
+# --- SQL hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+    observe("grobs_db_query_duration_seconds", {}, elapsed)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += elapsed
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    start_times = exception_context.connection.info.get("query_start_times") if exception_context.connection else None
+    if start_times:
+        start_times.pop()
+
+def instrument_engine(engine):
+    """Counts and times every SQL statement the engine runs."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and counts its SQL statements, per route.
+    It's plain ASGI (not BaseHTTPMiddleware) so it adds almost nothing
+    to a request and doesn't get in the way of streaming responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_timings.reset(token)
+
+            # The route template (/resume/{resume_id}), not the real path, so
+            # every resume shares one set of metrics
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            observe(
+                "grobs_http_request_duration_seconds",
+                {"method": scope["method"], "route": route_path, "status": str(status_code)},
+                elapsed
+            )
+            labels = {"method": scope["method"], "route": route_path}
+            inc("grobs_http_request_db_queries_total", labels, timings.db_queries)
+            inc("grobs_http_request_db_seconds_total", labels, timings.db_seconds)
+
+
+# --- Prometheus output ---
+
+def _format_labels(label_pairs, extra: tuple = ()):
+    pairs = list(label_pairs) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def render_prometheus():
+    """Everything recorded so far, in the Prometheus text format."""
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    described = set()
+
+    def describe(name: str, kind: str):
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, label_pairs), histogram in histograms:
+        describe(name, "histogram")
+        cumulative = 0
+        for upper, count in zip(histogram.buckets, histogram.bucket_counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(label_pairs, (('le', upper),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(label_pairs, (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(label_pairs)} {histogram.total}")
+        lines.append(f"{name}_count{_format_labels(label_pairs)} {histogram.count}")
+
+    for (name, label_pairs), value in counters:
+        describe(name, "counter")
+        lines.append(f"{name}{_format_labels(label_pairs)} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,46 @@
+"""
+Moves resumes between the two storage modes (see resume_documents.py):
+
+    python migrate_storage.py --to document            # sections -> one document per resume
+    python migrate_storage.py --to tables              # documents -> section tables
+    python migrate_storage.py --to document --recompress
+
+Set RESUME_STORAGE to match afterwards. The app keeps serving resumes stored
+either way, so this can run while it's up, and can be stopped and run again.
+"""
+import argparse
+import json
+import time
+
+import crud
+import database
+import models
+import resume_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=["document", "tables"], required=True)
+    parser.add_argument("--batch-size", type=int, default=200, help="resumes per transaction")
+    parser.add_argument(
+        "--recompress", action="store_true",
+        help="also re-encode documents stored with other RESUME_DOCUMENT_COMPRESSION settings"
+    )
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    database.add_missing_columns()
+
+    start = time.perf_counter()
+    with database.SessionLocal() as db:
+        result = crud.migrate_resume_storage(db, to=args.to, batch_size=args.batch_size, recompress=args.recompress)
+    print(json.dumps({
+        "to": args.to,
+        "compression": resume_documents.RESUME_DOCUMENT_COMPRESSION,
+        **result,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }))
+
+
+if __name__ == "__main__":
+    main()
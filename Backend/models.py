@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, Float, DateTime, Index, LargeBinary
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from database import Base # Use absolute import
 
@@ -26,6 +27,25 @@ class Resume(Base):
     phone = Column(String, nullable=True)
     linkedin_url = Column(String, nullable=True)
     template_name = Column(String, default="classic")
+
+    # --- Summary info (kept up to date by crud.py) ---
+    # These let the dashboard list resumes without touching the section tables
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    education_count = Column(Integer, default=0)
+    experience_count = Column(Integer, default=0)
+    project_count = Column(Integer, default=0)
+    skill_count = Column(Integer, default=0)
+    # Goes up by one on every change, so clients can tell if their copy is current (ETags)
+    revision = Column(Integer, default=1)
+
+    # --- Document storage (see resume_documents.py) ---
+    # With RESUME_STORAGE=document all the sections live here, as one (optionally
+    # compressed) JSON document, instead of in the section tables. NULL means
+    # this resume's sections are in the tables.
+    document = Column(LargeBinary, nullable=True)
+    # Whether the resume is in the search index (see search_index.py). New resumes
+    # are indexed as they're saved; NULL marks one from before the index existed
+    search_indexed = Column(Boolean, default=True)
     
     # --- Links ---
     # Link to the user who owns this resume
@@ -34,12 +54,12 @@ class Resume(Base):
     
     
     
-    # Links to the other sections
-    education = relationship("Education", back_populates="resume", cascade="all, delete-orphan")
-    experience = relationship("Experience", back_populates="resume", cascade="all, delete-orphan")
-    projects = relationship("Project", back_populates="resume", cascade="all, delete-orphan")
+    # Links to the other sections (in id order, which is the order the user gave them)
+    education = relationship("Education", back_populates="resume", cascade="all, delete-orphan", order_by="Education.id")
+    experience = relationship("Experience", back_populates="resume", cascade="all, delete-orphan", order_by="Experience.id")
+    projects = relationship("Project", back_populates="resume", cascade="all, delete-orphan", order_by="Project.id")
 
-    skills = relationship("Skill", back_populates="resume", cascade="all, delete-orphan")
+    skills = relationship("Skill", back_populates="resume", cascade="all, delete-orphan", order_by="Skill.id")
 
 # --- NEW: Education Model ---
 class Education(Base):
@@ -92,4 +112,98 @@ class Skill(Base):
 
     # Link to the resume it belongs to
     resume_id = Column(Integer, ForeignKey("resumes.id"))
-    resume = relationship("Resume", back_populates="skills")
\ No newline at end of file
+    resume = relationship("Resume", back_populates="skills")
+
+# --- NEW: Analysis Cache Model ---
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 of the resume payload + normalized job description + model name
+    cache_key = Column(String, unique=True, index=True, nullable=False)
+    result = Column(Text, nullable=False) # The analysis, stored as JSON text
+
+    # Unix timestamps, used for the TTL and for LRU eviction
+    created_at = Column(Float, nullable=False)
+    last_used_at = Column(Float, nullable=False, index=True)
+
+    # The resume this analysis belongs to (so we can invalidate it)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), index=True)
+
+
+# --- NEW: Search Index Model ---
+# An inverted index: one row per (resume, term, source), so
+# "which resumes mention kubernetes?" is a single indexed lookup.
+class ResumeTerm(Base):
+    __tablename__ = "resume_terms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    term = Column(String, nullable=False, index=True)
+    source = Column(String, nullable=False) # "skills", "experience" or "projects"
+    weight = Column(Float, nullable=False) # How much a match from this source counts
+
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=False, index=True)
+    # Copied from the resume so a search only ever reads this table
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+
+# --- NEW: Analysis Job Model ---
+# Analyses that run in the background. This table is also the queue:
+# workers pick up 'queued' rows, so no external broker is needed.
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=False, index=True)
+    job_description = Column(Text, nullable=False)
+
+    # "queued" -> "running" -> "done" or "failed"
+    status = Column(String, nullable=False, default="queued", index=True)
+    result = Column(Text, nullable=True) # The analysis, stored as JSON text
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # The worker running a job touches this regularly; a 'running' job whose
+    # heartbeat is too old belongs to a worker that died, so it's queued again
+    heartbeat_at = Column(DateTime, nullable=True)
+
+
+# --- NEW: Job Description Model ---
+# Every distinct job description is stored once (keyed by a hash of its
+# normalized text), however many analyses use it.
+class JobDescription(Base):
+    __tablename__ = "job_descriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, unique=True, index=True, nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+# --- NEW: Analysis History Model ---
+# Every analysis a user got back, so old scores can be looked up instead of re-run.
+class AnalysisRecord(Base):
+    __tablename__ = "analyses"
+    __table_args__ = (
+        # "History of this resume" and "latest analysis of this resume for this JD"
+        Index("ix_analyses_resume_jd", "resume_id", "job_description_id", "id"),
+        # "Every resume of mine analyzed against this JD"
+        Index("ix_analyses_owner_jd", "owner_id", "job_description_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=False)
+    job_description_id = Column(Integer, ForeignKey("job_descriptions.id"), nullable=False)
+
+    # Hash of the resume data that was analyzed: if the resume still hashes
+    # the same, this analysis is still current
+    resume_hash = Column(String, nullable=False)
+    model_name = Column(String, nullable=False)
+
+    score = Column(Float, nullable=False)
+    result = Column(Text, nullable=False) # The full analysis, stored as JSON text
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
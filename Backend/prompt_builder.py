@@ -0,0 +1,158 @@
+import json
+import math
+import os
+import re
+
+# --- Token budgets ---
+# We can't run the real tokenizer offline, so we estimate ~4 characters per token,
+# which is close enough for English text and JSON.
+CHARS_PER_TOKEN = 4
+# How many (estimated) tokens the resume and the job description may use in a prompt
+PROMPT_RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", 1500))
+PROMPT_JD_TOKEN_BUDGET = int(os.getenv("PROMPT_JD_TOKEN_BUDGET", 1500))
+
+# Fields that don't help matching a resume to a job, so the AI never sees them
+IRRELEVANT_FIELDS = {"full_name", "email", "phone", "linkedin_url"}
+
+# The longest a single responsibilities/description text may start out as.
+# If the resume is still over budget, this is halved until it fits.
+MAX_TEXT_CHARS = 600
+MIN_TEXT_CHARS = 80
+
+PROMPT_TEMPLATE = """You are GROBS.AI, an expert career coach and resume optimization bot.
+Analyze the user's resume against the job description.
+
+RESUME (JSON):
+{resume}
+
+JOB DESCRIPTION:
+{job_description}
+
+Give a critical analysis: focus on what is missing and how they can improve.
+Return *only* the requested JSON, with the fields in this order: score, missing_keywords, suggestions."""
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_BULLET_RE = re.compile(r"^[\s\-*•·]+")
+
+
+def estimate_tokens(text: str):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _truncate(text: str, max_chars: int):
+    """Cuts a text at a word boundary so it fits in max_chars."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+def _dedupe_sentences(text: str, seen: set):
+    """
+    Removes sentences we've already seen (in this text or elsewhere in the resume),
+    plus bullets and extra whitespace.
+    """
+    kept = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text or ""):
+        sentence = " ".join(_BULLET_RE.sub("", sentence).split())
+        key = sentence.casefold()
+        if sentence and key not in seen:
+            seen.add(key)
+            kept.append(sentence)
+    return " ".join(kept)
+
+
+def _clean_resume(resume_data: dict):
+    """Drops irrelevant and empty fields, and duplicate skills and sentences."""
+    seen_sentences = set()
+    cleaned = {}
+
+    for key, value in resume_data.items():
+        if key in IRRELEVANT_FIELDS:
+            continue
+
+        if key == "skills":
+            unique = {}
+            for skill in value:
+                if skill and skill.strip():
+                    unique.setdefault(skill.strip().casefold(), skill.strip())
+            value = list(unique.values())
+
+        elif isinstance(value, list):
+            items = []
+            for item in value:
+                item = {
+                    field: (_dedupe_sentences(text, seen_sentences) if isinstance(text, str) and len(text) > 40 else text)
+                    for field, text in item.items()
+                }
+                item = {field: text for field, text in item.items() if text not in (None, "", [])}
+                if item:
+                    items.append(item)
+            value = items
+
+        if value not in (None, "", []):
+            cleaned[key] = value
+
+    return cleaned
+
+def _cap_texts(resume: dict, max_chars: int):
+    """Returns a copy of the resume with every long text cut to max_chars."""
+    return {
+        key: [
+            {field: _truncate(text, max_chars) if isinstance(text, str) else text for field, text in item.items()}
+            for item in value
+        ] if key != "skills" and isinstance(value, list) else value
+        for key, value in resume.items()
+    }
+
+def compact_resume(resume_data: dict, budget_tokens: int = PROMPT_RESUME_TOKEN_BUDGET):
+    """
+    Serializes the resume payload as compactly as we can while staying under the budget.
+    Returns (json_text, was_truncated).
+    """
+    cleaned = _clean_resume(resume_data)
+    max_chars = MAX_TEXT_CHARS
+
+    while True:
+        capped = _cap_texts(cleaned, max_chars)
+        text = json.dumps(capped, separators=(",", ":"), ensure_ascii=False)
+        if estimate_tokens(text) <= budget_tokens or max_chars <= MIN_TEXT_CHARS:
+            return text, capped != cleaned
+        max_chars //= 2
+
+def compact_job_description(job_description: str, budget_tokens: int = PROMPT_JD_TOKEN_BUDGET):
+    """
+    Cleans up a job description and cuts it to the budget.
+    Returns (text, was_truncated).
+    """
+    seen = set()
+    lines = []
+    for line in (job_description or "").splitlines():
+        line = " ".join(line.split())
+        if line and line.casefold() not in seen:
+            seen.add(line.casefold())
+            lines.append(line)
+
+    text = "\n".join(lines)
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    return _truncate(text, max_chars), len(text) > max_chars
+
+
+def build_prompt(resume_data: dict, job_description: str, job_description_section: tuple | None = None):
+    """
+    Builds the compact analysis prompt.
+    Pass 'job_description_section' as (text, was_truncated) if the job description
+    was already compacted (see jd_preprocessor), so it isn't done again.
+    Returns (prompt, stats), where stats holds the estimated token counts.
+    """
+    resume_text, resume_truncated = compact_resume(resume_data)
+    if job_description_section is None:
+        job_description_section = compact_job_description(job_description)
+    jd_text, jd_truncated = job_description_section
+
+    prompt = PROMPT_TEMPLATE.format(resume=resume_text, job_description=jd_text)
+    stats = {
+        "estimated_tokens": estimate_tokens(prompt),
+        "resume_tokens": estimate_tokens(resume_text),
+        "job_description_tokens": estimate_tokens(jd_text),
+        "truncated": resume_truncated or jd_truncated,
+    }
+    return prompt, stats
@@ -0,0 +1,277 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import metrics
+
+# --- Settings ---
+# RATE_LIMIT_ENABLED=0 turns every limit off (handy for load tests)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Where the counters live:
+#   "memory" - in this process (the default; each worker counts on its own)
+#   "sqlite" - in a SQLite file, so every worker on this machine shares the same limits
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db")
+# How many keys (users/IPs) the memory backend remembers at most
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Use the first X-Forwarded-For address as the client IP (only behind a proxy you trust!)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+# How many analyses one user may have running at the same time
+MAX_CONCURRENT_ANALYSES = int(os.getenv("RATE_LIMIT_MAX_CONCURRENT_ANALYSES", 2))
+# A running analysis whose slot wasn't given back after this long (a crashed
+# worker, a dropped stream) stops counting against the user
+ANALYSIS_SLOT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_ANALYSIS_SLOT_LEASE_SECONDS", 300))
+# The Retry-After we send when all of a user's analysis slots are taken
+ANALYSIS_SLOT_RETRY_AFTER = int(os.getenv("RATE_LIMIT_ANALYSIS_SLOT_RETRY_AFTER", 5))
+
+# The token bucket limits, as "requests/period" (period: second, minute or hour).
+# Each one can be changed with an environment variable, e.g. RATE_LIMIT_ANALYZE_USER=60/minute,
+# or turned off with "off". A bucket holds that many requests and refills evenly over the period.
+DEFAULT_LIMITS = {
+    "login_ip": "20/minute",        # POST /token, per client IP
+    "login_account": "10/minute",   # POST /token, per email (slows down password guessing)
+    "register_ip": "5/minute",      # POST /register/, per client IP
+    "analyze_user": "30/minute",    # AI analyses, per user (a batch costs one per item)
+    "analyze_ip": "120/minute",     # AI analyses, per client IP (many accounts, one script)
+}
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+if RATE_LIMIT_BACKEND not in ("memory", "sqlite"):
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{RATE_LIMIT_BACKEND}'. Use 'memory' or 'sqlite'.")
+
+
+def parse_limit(value: str):
+    """Turns "20/minute" into (capacity, tokens refilled per second), or None for "off"."""
+    if value.strip().lower() == "off":
+        return None
+    try:
+        count, period = value.strip().split("/")
+        capacity = int(count)
+        seconds = _PERIODS[period.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{value}'. Use e.g. '20/minute' or 'off'.")
+    if capacity <= 0:
+        raise ValueError(f"Invalid rate limit '{value}'. The count must be at least 1.")
+    return capacity, capacity / seconds
+
+LIMITS = {
+    name: os.getenv(f"RATE_LIMIT_{name.upper()}", default) for name, default in DEFAULT_LIMITS.items()
+}
+_BUCKETS = {name: parse_limit(value) for name, value in LIMITS.items()}
+
+
+# --- Backends ---
+# A backend stores the buckets and the analysis slots. Each one has three methods:
+#   take(key, capacity, rate, cost) -> seconds to wait (0 means allowed, and the tokens were taken)
+#   acquire(key, limit, lease_seconds) -> a slot id, or None if 'limit' slots are in use
+#   release(key, slot_id)
+# so another shared store can be added next to these two.
+
+def _refill(tokens: float, updated: float, now: float, capacity: int, rate: float, cost: int):
+    """One token bucket step. Returns (tokens left, seconds to wait)."""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class MemoryBackend:
+    """Buckets and slots in dicts. Fast, but every worker process has its own."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last update)
+        self._slots = {}  # key -> {slot id: expires at}
+        self._slot_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, cost: int):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, wait = _refill(tokens, updated, now, capacity, rate, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Forgetting the least recently used keys only ever lets someone through early
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def acquire(self, key: str, limit: int, lease_seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            slots = self._slots.setdefault(key, {})
+            for slot_id, expires_at in list(slots.items()):
+                if expires_at <= now:
+                    del slots[slot_id]
+            if len(slots) >= limit:
+                return None
+            slot_id = next(self._slot_ids)
+            slots[slot_id] = now + lease_seconds
+            return slot_id
+
+    def release(self, key: str, slot_id):
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is not None:
+                slots.pop(slot_id, None)
+                if not slots:
+                    del self._slots[key]
+
+
+class SQLiteBackend:
+    """
+    Buckets and slots in a SQLite file, so every worker process on the machine
+    shares them. Each check is one short write transaction (BEGIN IMMEDIATE),
+    which is what makes the read-modify-write safe between processes.
+    """
+
+    # Buckets untouched for this long are full again, so they're deleted
+    STALE_SECONDS = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._checks = 0
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_slots "
+                "(slot_id TEXT PRIMARY KEY, key TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_slots_key ON rate_limit_slots (key)")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, so each thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5)
+        return conn
+
+    def take(self, key: str, capacity: int, rate: float, cost: int):
+        # Wall-clock time, since it's compared between processes
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, wait = _refill(tokens, updated, now, capacity, rate, cost)
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now)
+            )
+            self._checks += 1
+            if self._checks % 1000 == 0:
+                conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.STALE_SECONDS,))
+        return wait
+
+    def acquire(self, key: str, limit: int, lease_seconds: float):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM rate_limit_slots WHERE key = ? AND expires_at <= ?", (key, now))
+            (in_use,) = conn.execute("SELECT COUNT(*) FROM rate_limit_slots WHERE key = ?", (key,)).fetchone()
+            if in_use >= limit:
+                return None
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO rate_limit_slots (slot_id, key, expires_at) VALUES (?, ?, ?)",
+                (slot_id, key, now + lease_seconds)
+            )
+        return slot_id
+
+    def release(self, key: str, slot_id):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM rate_limit_slots WHERE slot_id = ?", (slot_id,))
+
+
+def _make_backend():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    return MemoryBackend(RATE_LIMIT_MAX_KEYS)
+
+_backend = _make_backend() if RATE_LIMIT_ENABLED else None
+
+_stats_lock = threading.Lock()
+_stats = {"checks": 0, "rejected": {}}
+
+
+def _count(name: str, rejected: bool):
+    with _stats_lock:
+        _stats["checks"] += 1
+        if rejected:
+            _stats["rejected"][name] = _stats["rejected"].get(name, 0) + 1
+    if rejected:
+        metrics.inc("grobs_rate_limit_rejections_total", {"limit": name})
+
+
+# --- The API used by the endpoints ---
+
+def hit(name: str, identity, cost: int = 1):
+    """
+    Takes 'cost' requests from the 'name' bucket of one user/IP/email.
+    Returns 0 if that's allowed, otherwise how many seconds until it would be.
+    A cost bigger than the whole bucket is charged as a full bucket, so it
+    can still go through (once) when the bucket is full.
+    """
+    bucket = _BUCKETS[name]
+    if _backend is None or bucket is None:
+        return 0
+    capacity, rate = bucket
+    wait = _backend.take(f"{name}:{identity}", capacity, rate, min(cost, capacity))
+    _count(name, rejected=wait > 0)
+    return wait
+
+def acquire_analysis_slots(user_id: int, wanted: int):
+    """
+    Reserves up to 'wanted' of the user's MAX_CONCURRENT_ANALYSES analysis slots
+    (as many as are free). Returns the slots (give each back with
+    release_analysis_slot); an empty list means they're all in use.
+    """
+    if _backend is None:
+        return [("disabled", None)] * wanted
+    key = f"analyses:{user_id}"
+    slots = []
+    while len(slots) < wanted:
+        slot_id = _backend.acquire(key, MAX_CONCURRENT_ANALYSES, ANALYSIS_SLOT_LEASE_SECONDS)
+        if slot_id is None:
+            break
+        slots.append((key, slot_id))
+    _count("analysis_concurrency", rejected=not slots)
+    return slots
+
+def release_analysis_slot(slot):
+    key, slot_id = slot
+    if _backend is not None and slot_id is not None:
+        _backend.release(key, slot_id)
+
+def client_ip(client_host: str | None, forwarded_for: str | None):
+    """The address we rate limit a request by."""
+    if RATE_LIMIT_TRUST_PROXY and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return client_host or "unknown"
+
+def stats():
+    with _stats_lock:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "backend": RATE_LIMIT_BACKEND,
+            "checks": _stats["checks"],
+            "rejected": dict(_stats["rejected"]),
+            "limits": dict(LIMITS),
+            "max_concurrent_analyses": MAX_CONCURRENT_ANALYSES,
+        }
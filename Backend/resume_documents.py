@@ -0,0 +1,102 @@
+import os
+import zlib
+from types import SimpleNamespace
+import fast_json
+import models
+
+# --- Settings ---
+# Where a resume's sections (education, experience, projects, skills) are stored:
+#   "tables"   - one row per item in the section tables (the default)
+#   "document" - one JSON document in the resume row itself, so reading or
+#                writing a whole resume touches a single row
+# Either way, resumes stored the other way keep working; migrate_storage.py moves them over.
+RESUME_STORAGE = os.getenv("RESUME_STORAGE", "tables")
+# "zlib" compresses documents (worth it for long resumes), "none" stores plain JSON
+RESUME_DOCUMENT_COMPRESSION = os.getenv("RESUME_DOCUMENT_COMPRESSION", "none")
+# Documents smaller than this are stored plain even with compression on
+COMPRESS_MIN_BYTES = int(os.getenv("RESUME_DOCUMENT_COMPRESS_MIN_BYTES", 512))
+
+if RESUME_STORAGE not in ("tables", "document"):
+    raise ValueError(f"Unknown RESUME_STORAGE '{RESUME_STORAGE}'. Use 'tables' or 'document'.")
+if RESUME_DOCUMENT_COMPRESSION not in ("none", "zlib"):
+    raise ValueError(f"Unknown RESUME_DOCUMENT_COMPRESSION '{RESUME_DOCUMENT_COMPRESSION}'. Use 'none' or 'zlib'.")
+
+# The first byte of a stored document says how the rest is encoded,
+# so plain and compressed documents can live side by side
+_PLAIN = b"j"
+_ZLIB = b"z"
+
+# The fields of each section's items (everything but the ids)
+SECTION_FIELDS = {
+    section: [column.name for column in model.__table__.columns if column.name not in ("id", "resume_id")]
+    for section, model in {
+        "education": models.Education,
+        "experience": models.Experience,
+        "projects": models.Project,
+        "skills": models.Skill,
+    }.items()
+}
+
+
+def use_documents():
+    """True if new and updated resumes should be stored as documents."""
+    return RESUME_STORAGE == "document"
+
+def encode(sections: dict) -> bytes:
+    """Turns {section: [item dicts]} into the bytes we store."""
+    data = fast_json.dumps(sections)
+    if RESUME_DOCUMENT_COMPRESSION == "zlib" and len(data) >= COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(data)
+    return _PLAIN + data
+
+def decode(document: bytes) -> dict:
+    """The opposite of encode()."""
+    kind, data = document[:1], document[1:]
+    if kind == _ZLIB:
+        data = zlib.decompress(data)
+    return fast_json.loads(data)
+
+def is_current_encoding(document: bytes):
+    """False if the document was stored with other compression settings than the current ones."""
+    return document[:1] == encode(decode(document))[:1]
+
+def sections_of(source) -> dict:
+    """
+    Gets {section: [item dicts]} from anything with education/experience/projects/skills
+    lists: incoming ResumeCreate data, or a table-stored Resume from the database.
+    """
+    return {
+        section: [{field: getattr(item, field) for field in fields} for item in getattr(source, section)]
+        for section, fields in SECTION_FIELDS.items()
+    }
+
+
+class ResumeView:
+    """
+    A document-stored resume that reads like a models.Resume: the sections are
+    lists of plain objects, and everything else comes from the row.
+    Section items get ids 1, 2, 3... (their position), since documents don't store ids.
+    """
+
+    def __init__(self, db_resume: models.Resume, sections: dict | None = None):
+        self._row = db_resume
+        if sections is None:
+            sections = decode(db_resume.document)
+        for section in SECTION_FIELDS:
+            setattr(self, section, [
+                SimpleNamespace(id=number, resume_id=db_resume.id, **item)
+                for number, item in enumerate(sections.get(section, []), start=1)
+            ])
+
+    def __getattr__(self, name):
+        return getattr(self._row, name)
+
+
+def readable(db_resume: models.Resume | None):
+    """
+    Returns a resume whose sections can be read, however it's stored:
+    table-stored resumes as they are, document-stored ones as a ResumeView.
+    """
+    if db_resume is None or db_resume.document is None:
+        return db_resume
+    return ResumeView(db_resume)
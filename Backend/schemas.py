@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, field_validator
+import json
+from typing import Dict, List, Optional
+from datetime import datetime
 
 # --- User Schemas (No changes) ---
 
@@ -128,6 +130,47 @@ class Resume(ResumeCreate):
     class Config:
         from_attributes = True
 
+class ResumeBulkCreate(BaseModel):
+    """Many resumes to import at once"""
+    resumes: List[ResumeCreate]
+
+class ResumeBulkCreateResult(BaseModel):
+    created: int
+    ids: List[int]
+
+# This is the schema for *partially* updating a resume (PATCH)
+# Anything left out is not changed. A section that is sent replaces that whole section.
+class ResumePatch(BaseModel):
+    full_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    linkedin_url: Optional[str] = None
+    template_name: Optional[str] = None
+
+    education: Optional[List[EducationCreate]] = None
+    experience: Optional[List[ExperienceCreate]] = None
+    projects: Optional[List[ProjectCreate]] = None
+    skills: Optional[List[SkillCreate]] = None
+
+# A lightweight version of a resume for lists (e.g. the dashboard)
+class ResumeSummary(BaseModel):
+    id: int
+    full_name: Optional[str] = None
+    template_name: Optional[str] = None
+    education_count: int = 0
+    experience_count: int = 0
+    project_count: int = 0
+    skill_count: int = 0
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ResumeSummaryPage(BaseModel):
+    """One page of resume summaries. Pass next_cursor back to get the next page."""
+    items: List[ResumeSummary]
+    next_cursor: Optional[int] = None
+
 # --- NEW: AI Analysis Schemas ---
 
 class JobDescriptionIn(BaseModel):
@@ -138,4 +181,110 @@ class AnalysisResult(BaseModel):
     """The structured JSON response from the AI"""
     score: float
     missing_keywords: List[str]
-    suggestions: str
\ No newline at end of file
+    suggestions: str
+
+class AnalysisCacheStats(BaseModel):
+    """Hit/miss counters for the analysis cache"""
+    hits: int
+    misses: int
+    expired: int
+    evictions: int
+    invalidations: int
+    hit_ratio: float
+    size: int
+    max_entries: int
+    ttl_seconds: int
+
+
+class JobDescriptionCacheStats(BaseModel):
+    """Hit/miss counters for the prepared job description cache"""
+    hits: int
+    misses: int
+    hit_ratio: float
+    size: int
+    max_entries: int
+
+
+class LLMClientStats(BaseModel):
+    """Counters from the resilient AI client"""
+    calls: int
+    successes: int
+    failures: int
+    retries: int
+    coalesced: int
+    circuit_opened: int
+    short_circuited: int
+    circuit_state: str
+    in_flight: int
+
+
+class RateLimitStats(BaseModel):
+    """The rate limits and how many requests each one rejected"""
+    enabled: bool
+    backend: str
+    checks: int
+    rejected: Dict[str, int]
+    limits: Dict[str, str]
+    max_concurrent_analyses: int
+
+
+class BatchJobDescriptionsIn(BaseModel):
+    """Many job descriptions to analyze one resume against"""
+    job_descriptions: List[str]
+
+class BatchResumesIn(BaseModel):
+    """Many of the user's resumes to analyze against one job description"""
+    job_description: str
+    resume_ids: List[int]
+
+
+class ResumeSearchIn(BaseModel):
+    """A job description (or any text) to rank the user's resumes against"""
+    text: str
+
+class ResumeSearchHit(BaseModel):
+    resume_id: int
+    full_name: Optional[str] = None
+    score: float
+    matched_terms: List[str]
+
+
+class AnalysisJob(BaseModel):
+    """A background analysis and (once it's done) its result"""
+    id: int
+    resume_id: int
+    status: str
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def parse_result(cls, value):
+        # The database stores the result as JSON text
+        return json.loads(value) if isinstance(value, str) else value
+
+
+class AnalysisRecord(BaseModel):
+    """One analysis from a resume's history"""
+    id: int
+    resume_id: int
+    job_description_id: int
+    model_name: str
+    score: float
+    result: AnalysisResult
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def parse_result(cls, value):
+        # The database stores the result as JSON text
+        return json.loads(value) if isinstance(value, str) else value
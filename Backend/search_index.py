@@ -0,0 +1,111 @@
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, selectinload
+import keyword_matcher
+import jd_preprocessor
+import models
+import resume_documents
+
+
+def _resume_terms(sections):
+    """
+    Gets the searchable terms of a resume.
+    'sections' is anything with skills/experience/projects lists: the incoming
+    ResumeCreate data or a Resume from the database (they use the same field names).
+    """
+    return keyword_matcher.resume_terms({
+        "skills": [skill.name for skill in sections.skills],
+        "experience": [
+            {"role": exp.role, "responsibilities": exp.responsibilities}
+            for exp in sections.experience
+        ],
+        "projects": [
+            {"name": proj.project_name, "description": proj.description}
+            for proj in sections.projects
+        ],
+    })
+
+def index_resume(db: Session, resume_id: int, owner_id: int, sections):
+    """
+    (Re)builds the index rows of one resume.
+    This does NOT commit, so it joins the caller's transaction.
+    """
+    remove_resume(db, resume_id)
+
+    rows = [
+        {
+            "term": term,
+            "source": source,
+            "weight": keyword_matcher.SOURCE_WEIGHTS[source],
+            "resume_id": resume_id,
+            "owner_id": owner_id,
+        }
+        for source, terms in _resume_terms(sections).items()
+        for term in terms
+    ]
+    if rows:
+        db.execute(insert(models.ResumeTerm), rows)
+
+def remove_resume(db: Session, resume_id: int):
+    """Removes a resume from the index (does NOT commit)."""
+    db.query(models.ResumeTerm).filter(
+        models.ResumeTerm.resume_id == resume_id
+    ).delete(synchronize_session=False)
+
+def backfill(db: Session):
+    """
+    Indexes resumes that were created before the index existed, and marks
+    them as indexed (even those without any terms) so this runs only once.
+    """
+    missing = db.query(models.Resume).filter(models.Resume.search_indexed.is_not(True)).options(
+        selectinload(models.Resume.experience),
+        selectinload(models.Resume.projects),
+        selectinload(models.Resume.skills),
+    ).all()
+    for resume in missing:
+        index_resume(db, resume.id, resume.owner_id, resume_documents.readable(resume))
+        resume.search_indexed = True
+    db.commit()
+
+
+def search(db: Session, owner_id: int, query: str, limit: int = 10):
+    """
+    Ranks all of a user's resumes against a query (e.g. a job description).
+    This is ONE indexed query over the term table, however many resumes
+    the user has. Returns dicts with resume_id, score and matched_terms, best first.
+    """
+    # Queries are often whole job descriptions, so reuse their prepared terms
+    query_terms = jd_preprocessor.prepare(query)["terms"]
+    if not query_terms:
+        return []
+    total_weight = sum(query_terms.values())
+
+    # For every (resume, term) hit, keep the best source weight
+    hits = (
+        db.query(
+            models.ResumeTerm.resume_id,
+            models.ResumeTerm.term,
+            func.max(models.ResumeTerm.weight),
+        )
+        .filter(
+            models.ResumeTerm.owner_id == owner_id,
+            models.ResumeTerm.term.in_(list(query_terms)),
+        )
+        .group_by(models.ResumeTerm.resume_id, models.ResumeTerm.term)
+        .all()
+    )
+
+    scores = {}
+    matched = {}
+    for resume_id, term, weight in hits:
+        scores[resume_id] = scores.get(resume_id, 0.0) + query_terms[term] * weight
+        matched.setdefault(resume_id, []).append(term)
+
+    ranked = sorted(scores, key=lambda resume_id: (-scores[resume_id], resume_id))[:limit]
+    return [
+        {
+            "resume_id": resume_id,
+            "score": round(scores[resume_id] / total_weight * 100, 1),
+            "matched_terms": sorted(matched[resume_id], key=lambda term: -query_terms[term]),
+        }
+        for resume_id in ranked
+    ]
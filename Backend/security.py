@@ -1,18 +1,82 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from pydantic import BaseModel
+import metrics
 
 # --- Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The bcrypt cost factor. Each +1 doubles the time a hash takes.
+# If you change it, existing users are re-hashed the next time they log in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+# bcrypt is slow on purpose, so we never run it on the event loop.
+# PASSWORD_HASH_POOL picks where it runs instead:
+#   "thread"  - a thread pool (bcrypt releases the GIL, so this uses several cores)
+#   "process" - a process pool (highest login throughput, costs more memory)
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# The untimed versions: these are what runs inside the hashing pool
+def _hash(password):
+    return pwd_context.hash(password)
+
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 def verify_password(plain_password, hashed_password):
     """Checks if the plain password matches the hashed one."""
-    return pwd_context.verify(plain_password, hashed_password)
+    with metrics.timer("password_verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     """Generates a secure hash for a plain-text password."""
-    return pwd_context.hash(password)
+    with metrics.timer("password_hash"):
+        return _hash(password)
+
+def verify_and_update_password(plain_password, hashed_password):
+    """
+    Checks the password and, if the stored hash uses old settings
+    (e.g. a lower cost factor), also returns a new hash to save.
+    Returns (is_valid, new_hash_or_None).
+    """
+    with metrics.timer("password_verify"):
+        return _verify_and_update(plain_password, hashed_password)
+
+_hash_executor = None
+
+def _get_hash_executor():
+    """Creates the hashing pool the first time we need it."""
+    global _hash_executor
+    if _hash_executor is None:
+        if PASSWORD_HASH_POOL == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        elif PASSWORD_HASH_POOL == "thread":
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+        else:
+            raise ValueError(f"Unknown PASSWORD_HASH_POOL '{PASSWORD_HASH_POOL}'. Use 'thread' or 'process'.")
+    return _hash_executor
+
+async def _run_in_hash_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), func, *args)
+
+async def get_password_hash_async(password):
+    """get_password_hash, run in the hashing pool so the event loop stays free."""
+    # Timed here (including any wait for a free worker), not inside the pool
+    with metrics.timer("password_hash"):
+        return await _run_in_hash_pool(_hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """verify_and_update_password, run in the hashing pool so the event loop stays free."""
+    with metrics.timer("password_verify"):
+        return await _run_in_hash_pool(_verify_and_update, plain_password, hashed_password)
 
 
 # --- JSON Web Token (JWT) ---
@@ -23,12 +87,20 @@ SECRET_KEY = "fa65bf978f9b46b1652c712c6b0f79b2b84af8d011383d1948fe047b758fc549"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 # A user stays logged in for 30 minutes
 
+# If this is on, a token that carries 'uid' and 'is_active' is trusted as-is
+# and we skip the database lookup for the user completely. The token is signed,
+# so it can't be forged, but changes to the user only show up on the next login.
+TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "0") == "1"
+
 class TokenData(BaseModel):
     """
     This is the data we'll store *inside* the token.
     'sub' is the standard name for the 'subject' (the user's email).
     """
     email: str | None = None
+    # Optional extra claims, used by the stateless fast path
+    uid: int | None = None
+    is_active: bool | None = None
 
 
 def create_access_token(data: dict):
@@ -56,7 +128,11 @@ def decode_access_token(token: str):
         if email is None:
             # Token is invalid if it doesn't have a 'sub' field
             return None
-        return TokenData(email=email)
+        return TokenData(
+            email=email,
+            uid=payload.get("uid"),
+            is_active=payload.get("is_active")
+        )
     except JWTError:
         # Token is invalid (expired, wrong signature, etc.)
         return None
\ No newline at end of file
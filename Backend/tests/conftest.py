@@ -0,0 +1,78 @@
+"""
+Shared setup for the backend tests. Run them from the 'Backend' folder:
+
+    python -m pytest -q tests
+
+They use a throwaway SQLite database and the local fake AI provider,
+so they need no network and no API key.
+"""
+import os
+import sys
+import tempfile
+
+# The backend modules import each other as top-level modules (import crud, ...)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# These have to be set before any backend module is imported
+_tmp_dir = tempfile.mkdtemp(prefix="grobs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+# Tests run the analysis job workers themselves, when they need them
+os.environ["ANALYSIS_JOB_WORKERS"] = "0"
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+_emails = itertools.count(1)
+
+
+def sample_resume(n: int = 1, section_size: int = 1):
+    """A resume payload like the frontend sends."""
+    return {
+        "full_name": f"Test User {n}",
+        "email": f"user{n}@example.com",
+        "phone": None,
+        "linkedin_url": None,
+        "template_name": "classic",
+        "education": [
+            {"school": f"School {i}", "degree": "BSc", "start_date": "2010", "end_date": "2014"}
+            for i in range(section_size)
+        ],
+        "experience": [
+            {"company": f"Company {i}", "role": "Engineer", "start_date": "2015", "end_date": "2020",
+             "responsibilities": "Built Python APIs with FastAPI and SQL"}
+            for i in range(section_size)
+        ],
+        "projects": [
+            {"project_name": f"Project {i}", "description": "A Docker and Kubernetes tool", "project_url": None}
+            for i in range(section_size)
+        ],
+        "skills": [{"name": f"Skill {i}"} for i in range(section_size)],
+    }
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tables():
+    """Creates the tables, for tests that use crud without going through the app."""
+    import database
+    import models
+    models.Base.metadata.create_all(bind=database.engine)
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers(client):
+    """Registers a fresh user and returns the headers to act as them."""
+    email = f"tester{next(_emails)}@example.com"
+    client.post("/register/", json={"email": email, "password": "secret"})
+    token = client.post("/token", data={"username": email, "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
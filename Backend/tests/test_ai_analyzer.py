@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+import ai_analyzer
+
+ANALYSIS = {
+    "score": 72.5,
+    "missing_keywords": ["Kubernetes", "a \"quoted\" ] term"],
+    "suggestions": "- Line one\n- Say \"Docker\" \\ café ✓",
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 10000])
+def test_the_parser_sends_each_field_in_order(chunk_size):
+    # Escaped like a real JSON answer (\n, \", \\ and \uXXXX)
+    answer = json.dumps(ANALYSIS)
+    parser = ai_analyzer.StreamingAnalysisParser()
+    events = []
+    for start in range(0, len(answer), chunk_size):
+        events.extend(parser.feed(answer[start:start + chunk_size]))
+
+    names = [event for event, _ in events]
+    assert names[:2] == ["score", "missing_keywords"]
+    assert set(names[2:]) == {"suggestions"}
+    assert events[0][1] == {"score": 72.5}
+    assert events[1][1] == {"missing_keywords": ANALYSIS["missing_keywords"]}
+    assert "".join(data["delta"] for _, data in events[2:]) == ANALYSIS["suggestions"]
+
+def test_the_parser_waits_for_a_field_to_be_complete():
+    parser = ai_analyzer.StreamingAnalysisParser()
+    assert parser.feed('{"score": 7') == []
+    assert parser.feed('2, "missing_keywords": ["Go"') == [("score", {"score": 72.0})]
+    assert parser.feed(']') == [("missing_keywords", {"missing_keywords": ["Go"]})]
@@ -0,0 +1,34 @@
+import ai_analyzer
+import models
+from conftest import sample_resume
+from database import SessionLocal
+
+
+def test_a_decisive_prescore_is_not_kept_as_the_ai_analysis(client, auth_headers, monkeypatch):
+    resume_id = client.post("/resume/", json=sample_resume(), headers=auth_headers).json()["id"]
+    job_description = {"text": "Senior Python developer with FastAPI and SQLAlchemy experience"}
+
+    # Every score is "too low", so the AI is skipped
+    monkeypatch.setattr(ai_analyzer, "PRESCORE_SKIP_BELOW", 101)
+    skipped = client.post(f"/resume/{resume_id}/analyses/latest", json=job_description, headers=auth_headers)
+    assert skipped.json()["model_name"] == ai_analyzer.PRESCORE_MODEL_NAME
+
+    # Once the AI is used again, the prescore isn't served as its analysis
+    monkeypatch.setattr(ai_analyzer, "PRESCORE_SKIP_BELOW", 0)
+    latest = client.post(f"/resume/{resume_id}/analyses/latest", json=job_description, headers=auth_headers)
+    assert latest.json()["model_name"] == ai_analyzer.model_name()
+
+def test_a_streamed_cache_hit_is_added_to_the_history(client, auth_headers):
+    resume_id = client.post("/resume/", json=sample_resume(), headers=auth_headers).json()["id"]
+    job_description = {"text": "Backend engineer, Python and Docker"}
+    stream = f"/resume/{resume_id}/analyze/stream"
+
+    client.post(stream, json=job_description, headers=auth_headers)  # Calls the AI and caches it
+    with SessionLocal() as db:
+        db.query(models.AnalysisRecord).filter(models.AnalysisRecord.resume_id == resume_id).delete()
+        db.commit()
+
+    response = client.post(stream, json=job_description, headers=auth_headers)
+    assert "event: done" in response.text
+    history = client.get(f"/resume/{resume_id}/analyses", headers=auth_headers).json()
+    assert len(history) == 1
@@ -0,0 +1,26 @@
+import analysis_cache
+import models
+from database import SessionLocal
+
+
+def test_a_concurrent_put_of_the_same_key_updates_the_row(monkeypatch):
+    with SessionLocal() as db:
+        analysis_cache.put(db, "race-key", resume_id=None, result={"score": 1})
+
+    # The other request stored the key between our lookup and our insert
+    find = analysis_cache._find
+    calls = []
+
+    def stale_find(db, key):
+        calls.append(key)
+        return None if len(calls) == 1 else find(db, key)
+
+    monkeypatch.setattr(analysis_cache, "_find", stale_find)
+
+    with SessionLocal() as db:
+        analysis_cache.put(db, "race-key", resume_id=None, result={"score": 2})
+
+    with SessionLocal() as db:
+        entries = db.query(models.AnalysisCacheEntry).filter_by(cache_key="race-key").all()
+        assert len(entries) == 1
+        assert analysis_cache.get(db, "race-key") == {"score": 2}
@@ -0,0 +1,34 @@
+import jd_preprocessor
+
+
+def test_boilerplate_lines_are_dropped():
+    text = "\n".join([
+        "Backend Engineer",
+        "Build APIs in Python.",
+        "Apply now!",
+        "Share this job",
+        "Privacy policy",
+        "We use cookies to improve your experience.",
+        "We are an equal opportunity employer and value diversity.",
+        "© 2024 Acme Inc. All rights reserved.",
+    ])
+    assert jd_preprocessor.clean_job_description(text) == "Backend Engineer\nBuild APIs in Python."
+
+def test_requirements_that_look_like_boilerplate_are_kept():
+    lines = [
+        "Experience building cookie consent and privacy policy tooling (GDPR)",
+        "Apply today's best practices in Python",
+    ]
+    clean = jd_preprocessor.clean_job_description("\n".join(["About the role", *lines]))
+    assert clean.splitlines()[1:] == lines
+
+def test_nothing_is_dropped_inside_the_requirements_section():
+    text = "Requirements:\n- Python\n- Apply now\nBenefits:\n- Apply now"
+    assert jd_preprocessor.clean_job_description(text) == "Requirements:\nPython\nApply now\nBenefits:"
+
+def test_new_cleaning_rules_change_the_fingerprint(monkeypatch):
+    before = jd_preprocessor.fingerprint("Python developer")
+    assert jd_preprocessor.fingerprint("  python   DEVELOPER ") == before
+
+    monkeypatch.setattr(jd_preprocessor, "JD_CLEANING_VERSION", jd_preprocessor.JD_CLEANING_VERSION + 1)
+    assert jd_preprocessor.fingerprint("Python developer") != before
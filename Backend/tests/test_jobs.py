@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import crud
+import jobs
+import schemas
+from conftest import sample_resume
+from database import SessionLocal
+
+_users = itertools.count(1)
+
+
+def queue_jobs(count: int):
+    """Creates a user with one resume and queues 'count' analyses of it. Returns the job ids."""
+    with SessionLocal() as db:
+        user = crud.create_user(
+            db, schemas.UserCreate(email=f"jobs{next(_users)}@example.com", password="unused"),
+            hashed_password="unused"
+        )
+        resume = crud.create_resume(db, schemas.ResumeCreate(**sample_resume()), user_id=user.id)
+        job_ids = [
+            crud.create_analysis_job(db, resume_id=resume.id, user_id=user.id, job_description=f"Python job {n}").id
+            for n in range(count)
+        ]
+        return user.id, job_ids
+
+def job_statuses(user_id: int, job_ids: list[int]):
+    with SessionLocal() as db:
+        return [crud.get_analysis_job(db, job_id=job_id, user_id=user_id).status for job_id in job_ids]
+
+
+def test_a_failing_job_does_not_stop_the_worker(monkeypatch):
+    user_id, job_ids = queue_jobs(2)
+
+    real_record_analysis = crud.record_analysis
+    calls = []
+    def record_analysis_fails_once(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return real_record_analysis(*args, **kwargs)
+    monkeypatch.setattr(crud, "record_analysis", record_analysis_fails_once)
+
+    async def run():
+        assert await jobs._work_once()
+        assert await jobs._work_once()
+
+    asyncio.run(run())
+    assert job_statuses(user_id, job_ids) == ["failed", "done"]
+
+def test_the_worker_loop_survives_a_claim_error(monkeypatch):
+    user_id, job_ids = queue_jobs(1)
+
+    real_claim = crud.claim_next_analysis_job
+    calls = []
+    def claim_fails_once(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return real_claim(*args, **kwargs)
+    monkeypatch.setattr(crud, "claim_next_analysis_job", claim_fails_once)
+    monkeypatch.setattr(jobs, "ANALYSIS_JOB_POLL_SECONDS", 0.01)
+
+    async def run():
+        jobs._wakeup = asyncio.Event()
+        worker = asyncio.create_task(jobs._worker_loop())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if job_statuses(user_id, job_ids) == ["done"]:
+                break
+        assert not worker.done()
+        worker.cancel()
+
+    asyncio.run(run())
+    assert job_statuses(user_id, job_ids) == ["done"]
+
+def test_only_jobs_with_an_expired_lease_are_requeued():
+    user_id, job_ids = queue_jobs(2)
+    with SessionLocal() as db:
+        # Both are claimed (by "another process"), but only the first one's worker died
+        first = crud.claim_next_analysis_job(db, {})
+        second = crud.claim_next_analysis_job(db, {})
+        first.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+        db.commit()
+
+        assert crud.requeue_expired_analysis_jobs(db, lease_seconds=60) == 1
+        assert job_statuses(user_id, job_ids) == ["queued", "running"]
+        # Leave the queue empty for the other tests
+        for job in (first, second):
+            crud.finish_analysis_job(db, job, result={"score": 1})
+
+def test_a_running_job_renews_its_lease(monkeypatch):
+    user_id, job_ids = queue_jobs(1)
+    monkeypatch.setattr(jobs, "ANALYSIS_JOB_LEASE_SECONDS", 0.06)
+
+    async def slow_run_job(db, job):
+        await asyncio.sleep(0.15)
+        # Still ours, however long the analysis takes
+        with SessionLocal() as other_db:
+            crud.requeue_expired_analysis_jobs(other_db, lease_seconds=0.06)
+        assert job_statuses(user_id, job_ids) == ["running"]
+        crud.finish_analysis_job(db, job, result={"score": 1})
+    monkeypatch.setattr(jobs, "_run_job", slow_run_job)
+
+    assert asyncio.run(jobs._work_once())
+    assert job_statuses(user_id, job_ids) == ["done"]
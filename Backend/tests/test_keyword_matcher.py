@@ -0,0 +1,25 @@
+import pytest
+
+import keyword_matcher
+
+
+def test_numbers_are_not_terms():
+    terms = keyword_matcher.extract_job_terms("5+ years Python, 10+ yrs AWS, 24/7 on-call")
+    assert set(terms) == {"python", "aws", "on-call"}
+
+def test_tech_names_keep_their_symbols():
+    assert keyword_matcher.tokenize("C++, C#, Node.js and CI/CD") == ["c++", "c#", "node.js", "ci/cd"]
+
+@pytest.mark.skipif(keyword_matcher.np is None, reason="needs numpy")
+def test_numpy_and_plain_python_scores_match(monkeypatch):
+    job_terms = keyword_matcher.extract_job_terms(
+        "Python FastAPI REST APIs, Docker and Kubernetes. Python and SQL. Machine learning, machine learning."
+    )
+    covered = keyword_matcher.resume_terms({
+        "skills": ["Python", "SQL"],
+        "experience": [{"role": "Engineer", "responsibilities": "Machine learning with REST APIs"}],
+        "projects": [{"name": "Deployer", "description": "Docker images"}],
+    })
+    with_numpy = keyword_matcher.score_terms(job_terms, covered)
+    monkeypatch.setattr(keyword_matcher, "np", None)
+    assert keyword_matcher.score_terms(job_terms, covered) == with_numpy
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import llm_client
+import llm_providers
+
+
+class BadPromptProvider(llm_providers.FakeProvider):
+    """Answers like a provider that refuses one prompt (e.g. a blocked response)."""
+
+    def generate(self, prompt: str) -> str:
+        raise ValueError("The response was blocked")
+
+    async def generate_async(self, prompt: str) -> str:
+        raise ValueError("The response was blocked")
+
+
+def make_client(provider, failure_threshold=2):
+    return llm_client.ResilientLLMClient(
+        provider, max_retries=0, base_delay=0, max_delay=0,
+        failure_threshold=failure_threshold, reset_seconds=0,
+    )
+
+def open_breaker(client):
+    """Opens the breaker; with reset_seconds=0 the next call is the half-open trial."""
+    client.provider.fail_first = client.provider.calls + client.breaker.failure_threshold
+    for _ in range(client.breaker.failure_threshold):
+        with pytest.raises(llm_providers.RetryableLLMError):
+            client.generate("prompt")
+    assert client.breaker.state == "open"
+
+
+def test_cancelled_half_open_stream_does_not_block_later_calls():
+    client = make_client(llm_providers.FakeProvider(latency_seconds=0.05))
+    open_breaker(client)
+
+    async def cancel_stream_mid_way():
+        stream = client.stream_async("prompt")
+        # Times out while the provider is still "thinking", like the per-chunk timeout
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), timeout=0.01)
+        await stream.aclose()
+
+    asyncio.run(cancel_stream_mid_way())
+    assert client.breaker.trial_running is False
+
+    # The next call is allowed through as the trial, and closes the breaker
+    assert client.generate("prompt")
+    assert client.breaker.state == "closed"
+
+def test_closed_half_open_stream_does_not_block_later_calls():
+    client = make_client(llm_providers.FakeProvider())
+    open_breaker(client)
+
+    async def client_goes_away():
+        stream = client.stream_async("prompt")
+        await stream.__anext__()
+        await stream.aclose()  # GeneratorExit inside the stream
+
+    asyncio.run(client_goes_away())
+    assert client.generate("prompt")
+    assert client.breaker.state == "closed"
+
+def test_bad_prompts_do_not_open_the_breaker():
+    client = make_client(BadPromptProvider(), failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            client.generate("prompt")
+    assert client.breaker.state == "closed"
+    assert client.metrics["failures"] == 5
+
+def test_temporary_errors_open_the_breaker():
+    client = make_client(llm_providers.FakeProvider())
+    client.breaker.reset_seconds = 60
+    open_breaker(client)
+    with pytest.raises(llm_client.CircuitOpenError):
+        client.generate("prompt")
+
+def test_a_temporary_error_is_retried():
+    provider = llm_providers.FakeProvider(fail_first=1)
+    client = llm_client.ResilientLLMClient(provider, max_retries=3, base_delay=0, max_delay=0)
+    assert client.generate("prompt")
+    assert client.metrics["retries"] == 1 and client.metrics["successes"] == 1
+
+    provider = llm_providers.FakeProvider(fail_first=1)
+    client = llm_client.ResilientLLMClient(provider, max_retries=3, base_delay=0, max_delay=0)
+    assert asyncio.run(client.generate_async("prompt"))
+    assert client.metrics["retries"] == 1 and client.metrics["successes"] == 1
+
+def test_giving_up_on_the_only_caller_cancels_the_call():
+    provider = llm_providers.FakeProvider(latency_seconds=0.2)
+    client = llm_client.ResilientLLMClient(provider)
+
+    async def time_out():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.generate_async("prompt"), timeout=0.02)
+        await asyncio.sleep(0.3)
+
+    asyncio.run(time_out())
+    # The provider never got to answer, and nothing is left in flight
+    assert provider.calls == 0
+    assert client.stats()["in_flight"] == 0
+
+def test_a_shared_call_keeps_running_while_someone_waits():
+    provider = llm_providers.FakeProvider(latency_seconds=0.1)
+    client = llm_client.ResilientLLMClient(provider)
+
+    async def one_gives_up():
+        patient = asyncio.ensure_future(client.generate_async("prompt"))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.generate_async("prompt"), timeout=0.02)
+        return await patient
+
+    assert asyncio.run(one_gives_up())
+    assert provider.calls == 1
+    assert client.metrics["coalesced"] == 1
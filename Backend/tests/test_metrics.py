@@ -0,0 +1,18 @@
+import pytest
+
+import metrics
+from conftest import sample_resume
+
+
+@pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="metrics are turned off")
+def test_prompt_size_is_reported(client, auth_headers):
+    metrics.reset()
+    resume_id = client.post("/resume/", json=sample_resume(), headers=auth_headers).json()["id"]
+    response = client.post(f"/resume/{resume_id}/analyze", json={"text": "Senior Python developer"},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert 'prompt;desc="' in response.headers["server-timing"]
+
+    exported = client.get("/metrics").text
+    assert "grobs_prompt_estimated_tokens_count 1" in exported
+    assert 'grobs_prompt_estimated_tokens_bucket{le="16000"} 1' in exported
@@ -0,0 +1,72 @@
+"""
+The number of SQL statements a request runs must not grow with the number
+of resumes (no N+1 queries): the same request costs the same at 1 and 50 resumes.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import database
+from conftest import sample_resume
+
+
+@contextmanager
+def count_queries():
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+
+def add_resumes(client, headers, count: int):
+    response = client.post(
+        "/resumes/bulk", json={"resumes": [sample_resume(n, section_size=3) for n in range(count)]}, headers=headers
+    )
+    assert response.status_code == 200
+    return [resume["id"] for resume in client.get("/resumes/", headers=headers).json()]
+
+def queries_for(client, headers, method: str, path: str, **kwargs):
+    # The first request may have to look the user up; only count the steady state
+    client.request(method, path, headers=headers, **kwargs)
+    with count_queries() as statements:
+        response = client.request(method, path, headers=headers, **kwargs)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.fixture(scope="module")
+def one_and_fifty(client):
+    """(headers, resume ids) for a user with 1 resume, and for a user with 50."""
+    users = []
+    for count in (1, 50):
+        email = f"queries{count}@example.com"
+        client.post("/register/", json={"email": email, "password": "secret"})
+        token = client.post("/token", data={"username": email, "password": "secret"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        users.append((headers, add_resumes(client, headers, count)))
+    return users
+
+def test_listing_resumes_is_constant(client, one_and_fifty):
+    counts = [queries_for(client, headers, "GET", "/resumes/") for headers, _ in one_and_fifty]
+    assert counts[0] == counts[1]
+
+def test_reading_a_resume_is_constant(client, one_and_fifty):
+    counts = [queries_for(client, headers, "GET", f"/resume/{ids[-1]}") for headers, ids in one_and_fifty]
+    assert counts[0] == counts[1]
+
+def test_analyzing_a_resume_is_constant(client, one_and_fifty):
+    counts = []
+    for headers, ids in one_and_fifty:
+        # A new job description each time, so it's a real (uncached) analysis both times
+        client.post(f"/resume/{ids[-1]}/analyze", json={"text": f"Warm up {len(ids)}"}, headers=headers)
+        with count_queries() as statements:
+            response = client.post(
+                f"/resume/{ids[-1]}/analyze", json={"text": f"Python developer {len(ids)}"}, headers=headers
+            )
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
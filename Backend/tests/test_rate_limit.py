@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import ai_analyzer
+import llm_providers
+import rate_limit
+from conftest import sample_resume
+
+
+class CountingProvider(llm_providers.FakeProvider):
+    """A slow fake AI that remembers the most calls it had running at once."""
+
+    def __init__(self):
+        super().__init__(latency_seconds=0.05)
+        self.running = 0
+        self.most_running = 0
+
+    async def generate_async(self, prompt: str) -> str:
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        try:
+            return await super().generate_async(prompt)
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Turns the rate limits on, with fresh counters, for one test."""
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend(rate_limit.RATE_LIMIT_MAX_KEYS))
+    monkeypatch.setattr(rate_limit, "MAX_CONCURRENT_ANALYSES", 2)
+
+@pytest.fixture
+def provider():
+    counting = CountingProvider()
+    ai_analyzer.set_provider(counting)
+    yield counting
+    ai_analyzer.set_provider(None)
+
+
+def test_a_batch_runs_no_more_analyses_at_once_than_the_user_has_slots(client, auth_headers, limits, provider):
+    resume_id = client.post("/resume/", json=sample_resume(), headers=auth_headers).json()["id"]
+    response = client.post(
+        f"/resume/{resume_id}/analyze/batch",
+        json={"job_descriptions": [f"Python developer number {n}" for n in range(6)]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 6
+    assert provider.most_running == 2
+    # Every slot was given back
+    assert rate_limit._backend._slots == {}
+
+def test_a_busy_user_gets_429_with_retry_after(client, auth_headers, limits):
+    user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+    held = rate_limit.acquire_analysis_slots(user_id, 2)
+    resume_id = client.post("/resume/", json=sample_resume(), headers=auth_headers).json()["id"]
+
+    response = client.post(f"/resume/{resume_id}/analyze", json={"text": "Python developer"}, headers=auth_headers)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    for slot in held:
+        rate_limit.release_analysis_slot(slot)
+    response = client.post(f"/resume/{resume_id}/analyze", json={"text": "Python developer"}, headers=auth_headers)
+    assert response.status_code == 200
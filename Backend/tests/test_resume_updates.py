@@ -0,0 +1,48 @@
+from conftest import sample_resume
+
+
+def create(client, headers, **sections):
+    payload = {**sample_resume(), **sections}
+    response = client.post("/resume/", json=payload, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def companies(resume):
+    return [item["company"] for item in resume["experience"]]
+
+def experience(*names):
+    return [
+        {"company": name, "role": "Engineer", "start_date": "2015", "end_date": "2020", "responsibilities": "Work"}
+        for name in names
+    ]
+
+
+def test_reordering_a_section_is_saved(client, auth_headers):
+    resume = create(client, auth_headers, experience=experience("A", "B"))
+    etag = client.get(f"/resume/{resume['id']}", headers=auth_headers).headers["etag"]
+
+    updated = client.put(f"/resume/{resume['id']}", json={**sample_resume(), "experience": experience("B", "A")},
+                         headers=auth_headers)
+    assert companies(updated.json()) == ["B", "A"]
+
+    reread = client.get(f"/resume/{resume['id']}", headers=auth_headers)
+    assert companies(reread.json()) == ["B", "A"]
+    assert reread.headers["etag"] != etag
+
+def test_prepending_an_item_keeps_the_order(client, auth_headers):
+    resume = create(client, auth_headers, experience=experience("A", "B"))
+    client.patch(f"/resume/{resume['id']}", json={"experience": experience("NEW", "A", "B")}, headers=auth_headers)
+    assert companies(client.get(f"/resume/{resume['id']}", headers=auth_headers).json()) == ["NEW", "A", "B"]
+    assert companies(client.get("/resumes/", headers=auth_headers).json()[0]) == ["NEW", "A", "B"]
+
+def test_unchanged_update_keeps_the_etag(client, auth_headers):
+    resume = create(client, auth_headers, experience=experience("A", "B"))
+    etag = client.get(f"/resume/{resume['id']}", headers=auth_headers).headers["etag"]
+    client.put(f"/resume/{resume['id']}", json={**sample_resume(), "experience": experience("A", "B")},
+               headers=auth_headers)
+    assert client.get(f"/resume/{resume['id']}", headers=auth_headers).headers["etag"] == etag
+
+def test_removing_an_item(client, auth_headers):
+    resume = create(client, auth_headers, experience=experience("A", "B", "C"))
+    client.patch(f"/resume/{resume['id']}", json={"experience": experience("A", "C")}, headers=auth_headers)
+    assert companies(client.get(f"/resume/{resume['id']}", headers=auth_headers).json()) == ["A", "C"]
@@ -0,0 +1,40 @@
+import crud
+import models
+import schemas
+import search_index
+from conftest import sample_resume
+from database import SessionLocal
+from test_query_counts import count_queries
+
+
+def test_backfill_indexes_old_resumes_once():
+    with SessionLocal() as db:
+        user = crud.create_user(
+            db, schemas.UserCreate(email="backfill@example.com", password="unused"), hashed_password="unused"
+        )
+        empty = {**sample_resume(), "experience": [], "projects": [], "skills": []}
+        resume_ids = [
+            crud.create_resume(db, schemas.ResumeCreate(**payload), user_id=user.id).id
+            for payload in (sample_resume(1, section_size=3), sample_resume(2, section_size=3), empty)
+        ]
+        # Make them look like resumes saved before the index existed
+        for resume_id in resume_ids:
+            search_index.remove_resume(db, resume_id)
+        db.query(models.Resume).filter(models.Resume.id.in_(resume_ids)).update(
+            {"search_indexed": None}, synchronize_session=False
+        )
+        db.commit()
+
+    with SessionLocal() as db, count_queries() as statements:
+        search_index.backfill(db)
+    # The resumes, then each section table once, however many resumes there are
+    assert len([statement for statement in statements if statement.startswith("SELECT")]) == 4
+
+    with SessionLocal() as db:
+        indexed = {row.resume_id for row in db.query(models.ResumeTerm.resume_id).distinct()}
+        assert set(resume_ids[:2]) <= indexed
+
+    # The resume without any terms isn't loaded again on the next start
+    with SessionLocal() as db, count_queries() as statements:
+        search_index.backfill(db)
+    assert len(statements) == 1
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import models
+import schemas
+
+# --- Settings ---
+# How long we trust a cached user before looking it up again
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+# How many users we keep in memory at most
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
+# email (the token's 'sub') -> (time it was cached, user snapshot)
+_users = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get(email: str):
+    """Returns the cached user for this email, or None if it's missing or too old."""
+    with _lock:
+        entry = _users.get(email)
+        if entry is None or time.monotonic() - entry[0] > USER_CACHE_TTL_SECONDS:
+            _users.pop(email, None)
+            _stats["misses"] += 1
+            return None
+        _users.move_to_end(email) # Most recently used goes to the end
+        _stats["hits"] += 1
+        return entry[1]
+
+def put(user: models.User):
+    """
+    Caches a snapshot of a user and returns it.
+    We store a plain schemas.User (id, email, is_active) rather than the
+    ORM object, because ORM objects belong to the session that loaded them.
+    """
+    snapshot = schemas.User.model_validate(user)
+    with _lock:
+        _users[snapshot.email] = (time.monotonic(), snapshot)
+        _users.move_to_end(snapshot.email)
+        # Drop the least recently used users if we're over the limit
+        while len(_users) > USER_CACHE_MAX_SIZE:
+            _users.popitem(last=False)
+    return snapshot
+
+def invalidate(email: str):
+    """Forgets a user, e.g. after it was created or changed."""
+    with _lock:
+        _users.pop(email, None)
+
+def clear():
+    with _lock:
+        _users.clear()
+
+def stats():
+    with _lock:
+        return {**_stats, "size": len(_users)}